@@ -11,48 +11,206 @@ Version: PDS_V1
 
 import os
 import time
+import multiprocessing
+
+# Start of this wake (the upload scheduler plans against the remaining wake budget)
+WAKE_START = time.monotonic()
 from pathlib import Path
-from ruamel.yaml import YAML
 from datetime import datetime
 
-from modules.HP_Network import RaspController, WifiConfigGui
-from modules.HP_LogManager import LogManager
-from modules.HP_Camera import CameraController
-from modules.HP_Sensor import SensorReader
-from modules.HP_UploadServer import DataUploader
+from modules.HP_Profiler import StartupProfile, WakeCycle
+
+# Import and construction times of each subsystem (reported at the end of the wake)
+Startup_Profile = StartupProfile(start=WAKE_START)
 
-# wait for 10 seconds 
-print("wait for 10 seconds ")
-time.sleep(10)
+# Only light modules are imported here; camera (cv2, picamera2), sensors (numpy, smbus2),
+# uploads (requests) and the portal (fastapi, uvicorn) are imported on first use below
+with Startup_Profile.measure("import", "HP_Network"):
+    from modules.HP_Network import RaspController
+with Startup_Profile.measure("import", "HP_LogManager"):
+    from modules.HP_LogManager import LogManager
+with Startup_Profile.measure("import", "HP_SystemMetrics"):
+    from modules.HP_SystemMetrics import SystemMetrics, clock_synchronized
 
 # ================================
 # Initialize controllers
 # ================================
 
-# Log manager and configuration handler
-Log_Manager = LogManager()
-Yaml = YAML()
+# Log manager (the serial port to the control board is opened on first use)
+with Startup_Profile.measure("init", "LogManager"):
+    Log_Manager = LogManager()
 
 # Directory for storing upload files
 UPLOAD_DIR = "upload_files"
 
+# Directory for archives waiting for a confirmed upload
+OUTBOX_DIR = "outbox"
+
+# Directory for upload state kept across wakes
+STATE_DIR = "upload_state"
+
 # Load configuration file
 CONFIG_DATA = Log_Manager.load_config()
 PDS_ID = CONFIG_DATA["CONFIG"].get("PDS_ID")
 PDS_MODE = CONFIG_DATA["CONFIG"].get("PDS_MODE")
 EXECUTION_HOURS = CONFIG_DATA["RPI"].get("EXECUTION_HOURS")
 NETWORK_THRES = CONFIG_DATA["NETWORK"].get("NETWORK_THRES")
+NETWORK_READY_TIMEOUT = CONFIG_DATA["NETWORK"].get("READY_TIMEOUT", 20)
+UPLOAD_CONFIG = CONFIG_DATA.get("UPLOAD", {})
+WAKE_BUDGET = UPLOAD_CONFIG.get("WAKE_BUDGET", 600)
+
+# Readiness deadlines replacing the fixed boot (10 s) and shutdown (180 s) sleeps
+BOOT_TIMEOUT = CONFIG_DATA["RPI"].get("BOOT_TIMEOUT", 10)
+CLOCK_TIMEOUT = CONFIG_DATA["RPI"].get("CLOCK_TIMEOUT", 15)
+UPLOAD_TIMEOUT = CONFIG_DATA["RPI"].get("UPLOAD_TIMEOUT", 30)
+LOG_TIMEOUT = CONFIG_DATA["RPI"].get("LOG_TIMEOUT", 5)
+SHUTDOWN_LINGER = CONFIG_DATA["RPI"].get("SHUTDOWN_LINGER", 0)
+
+# Awake time and energy per phase of this wake
+Wake_Cycle = WakeCycle(start=WAKE_START, power_w=CONFIG_DATA["RPI"].get("POWER_W", 3.0))
+Wake_Cycle.enter("boot")
 
 # Network and system controllers
-Rasp_Controller = RaspController()
-Wifi_Gui = WifiConfigGui()
+with Startup_Profile.measure("init", "RaspController"):
+    Rasp_Controller = RaspController(backend=CONFIG_DATA["NETWORK"].get("BACKEND", "AUTO"),
+                                     server_host=UPLOAD_CONFIG.get("SERVER_IP", "59.125.195.194"),
+                                     server_port=UPLOAD_CONFIG.get("SERVER_HTTP_PORT", 80),
+                                     wifi_state_path=str(Path(__file__).parent / STATE_DIR / "wifi_profile.json"))
+
+# CPU temperature, disk, memory, load and throttling (read in-process, cached)
+System_Metrics = SystemMetrics()
+
+# Wait for the network interface instead of a fixed 10 s. In WIFI mode the connect loop
+# below waits for the link itself, so only the wlan0 device has to exist; on Ethernet
+# the link has to be up (address, route, upstream).
+if PDS_MODE == "WIFI":
+    Wake_Cycle.wait_until("interfaces ready", lambda: os.path.exists("/sys/class/net/wlan0"), BOOT_TIMEOUT)
+else:
+    Wake_Cycle.wait_until("interfaces ready", lambda: Rasp_Controller.readiness.check("eth0")["upstream"],
+                          BOOT_TIMEOUT)
+
+
+# The subsystems below are built on first use (see HP_Profiler.LazySubsystem)
+def make_wifi_gui():
+    with Startup_Profile.measure("import", "HP_Network.WifiConfigGui"):
+        from modules.HP_Network import WifiConfigGui
+    with Startup_Profile.measure("init", "WifiConfigGui"):
+        return WifiConfigGui()
+
+
+def make_camera():
+    with Startup_Profile.measure("import", "HP_Camera"):
+        from modules.HP_Camera import CameraController
+    with Startup_Profile.measure("init", "CameraController"):
+        return CameraController()
+
+
+def make_sensor_reader():
+    with Startup_Profile.measure("import", "HP_Sensor"):
+        from modules.HP_Sensor import SensorReader
+    with Startup_Profile.measure("init", "SensorReader"):
+        return SensorReader()
+
+
+def make_upload_ledger():
+    with Startup_Profile.measure("import", "HP_Outbox"):
+        from modules.HP_Outbox import UploadLedger
+    with Startup_Profile.measure("init", "UploadLedger"):
+        return UploadLedger(ledger_path=Path(__file__).parent / STATE_DIR / "ledger.json")
+
+
+def make_data_uploader():
+    with Startup_Profile.measure("import", "HP_UploadServer"):
+        from modules.HP_UploadServer import DataUploader, CompressionPolicy
+    ledger = Upload_Ledger.get()
+    with Startup_Profile.measure("init", "DataUploader"):
+        # The uploader only keeps a reference to the sensor reader; hand it the shared lazy one
+        return DataUploader(location=PDS_ID,SensorReader=lambda: Sensor_Reader,
+                            packet_format=UPLOAD_CONFIG.get("PACKET_FORMAT", "LEGACY"),
+                            reliable=UPLOAD_CONFIG.get("RELIABLE_UDP", False),
+                            ack_deadline=UPLOAD_CONFIG.get("ACK_DEADLINE", 5),
+                            max_workers=UPLOAD_CONFIG.get("MAX_WORKERS", 2),
+                            chunk_size=UPLOAD_CONFIG.get("CHUNK_SIZE", 0),
+                            state_dir=Path(__file__).parent / STATE_DIR,
+                            compression_policy=CompressionPolicy(mode=UPLOAD_CONFIG.get("COMPRESSION", "AUTO"),
+                                                                 deflate_level=UPLOAD_CONFIG.get("DEFLATE_LEVEL", 6),
+                                                                 allow_lzma=UPLOAD_CONFIG.get("ALLOW_LZMA", False)),
+                            compress_workers=UPLOAD_CONFIG.get("COMPRESS_WORKERS", 4),
+                            ledger=ledger,
+                            log_shipping=UPLOAD_CONFIG.get("LOG_SHIPPING", "ARCHIVE"),
+                            server_ip=UPLOAD_CONFIG.get("SERVER_IP", "59.125.195.194"),
+                            server_udp_port=UPLOAD_CONFIG.get("SERVER_UDP_PORT", 8000),
+                            server_http_port=UPLOAD_CONFIG.get("SERVER_HTTP_PORT", 80),
+                            slot_window=UPLOAD_CONFIG.get("SLOT_WINDOW", 0),
+                            slot_jitter=UPLOAD_CONFIG.get("SLOT_JITTER", 0),
+                            metrics=System_Metrics)
+
+
+def make_upload_outbox():
+    with Startup_Profile.measure("import", "HP_Outbox"):
+        from modules.HP_Outbox import UploadOutbox
+    ledger = Upload_Ledger.get()
+    with Startup_Profile.measure("init", "UploadOutbox"):
+        return UploadOutbox(outbox_dir=Path(__file__).parent / OUTBOX_DIR,
+                            retry_base=UPLOAD_CONFIG.get("RETRY_BASE", 1800),
+                            retry_max=UPLOAD_CONFIG.get("RETRY_MAX", 86400),
+                            ledger=ledger)
+
+
+def make_upload_scheduler():
+    with Startup_Profile.measure("import", "HP_UploadServer"):
+        from modules.HP_UploadServer import UploadScheduler
+    with Startup_Profile.measure("init", "UploadScheduler"):
+        return UploadScheduler(history_path=Path(__file__).parent / STATE_DIR / "throughput.json")
+
+
+def make_upload_pipeline():
+    with Startup_Profile.measure("import", "HP_UploadPipeline"):
+        from modules.HP_UploadPipeline import UploadPipeline
+    uploader, outbox, scheduler = Data_Uploader.get(), Upload_Outbox.get(), Upload_Scheduler.get()
+    with Startup_Profile.measure("init", "UploadPipeline"):
+        return UploadPipeline(uploader, outbox, scheduler=scheduler)
+
+
+def uploads_settled():
+    """
+    Shutdown condition: uploads are confirmed in the outbox as they finish (HTTP 200 or a
+    recorded failure), but a pipeline that hit the wake deadline can leave compression
+    processes writing archives. Wait until those have exited.
+    """
+    return not multiprocessing.active_children()
+
+
+def logs_flushed():
+    """
+    Shutdown condition: log files fsynced and the page cache written back.
+    """
+    flushed = Log_Manager.flush()
+    os.sync()
+    return flushed
+
+
+# Wi-Fi configuration portal (only in AP mode)
+Wifi_Gui = Startup_Profile.lazy("WifiConfigGui", make_wifi_gui)
 
 # Camera and sensor controllers
-Rasp_Camera = CameraController()
-Sensor_Reader = SensorReader()
+Rasp_Camera = Startup_Profile.lazy("CameraController", make_camera)
+Sensor_Reader = Startup_Profile.lazy("SensorReader", make_sensor_reader)
+
+# Content-hash record of what was already compressed, queued or uploaded
+Upload_Ledger = Startup_Profile.lazy("UploadLedger", make_upload_ledger)
 
 # Initialize the data uploader with the device ID
-Data_Uploader = DataUploader(location=PDS_ID,SensorReader=SensorReader)
+Data_Uploader = Startup_Profile.lazy("DataUploader", make_data_uploader)
+
+# Persistent upload queue (survives failed uploads and reboots)
+Upload_Outbox = Startup_Profile.lazy("UploadOutbox", make_upload_outbox)
+
+# Decides which queued archives fit into the rest of this wake
+Upload_Scheduler = Startup_Profile.lazy("UploadScheduler", make_upload_scheduler)
+
+# Overlapping telemetry / compression / upload stages (UPLOAD.PIPELINE)
+Upload_Pipeline = Startup_Profile.lazy("UploadPipeline", make_upload_pipeline)
 
 # ================================
 # Wi-Fi Configuration & Connection
@@ -61,6 +219,9 @@ Data_Uploader = DataUploader(location=PDS_ID,SensorReader=SensorReader)
 
 if __name__ == "__main__":
 
+    Startup_Profile.mark("controllers ready")
+    Wake_Cycle.enter("network")
+
     while PDS_MODE == "WIFI":
         # Reload configuration data before each attempt
         CONFIG_DATA = Log_Manager.load_config()
@@ -76,6 +237,7 @@ if __name__ == "__main__":
         # Check if Wi-Fi credentials not exist
         if not wifi_ssid or not wifi_password:
             Log_Manager.log_message("info", "M00", "No SSID or password recorded")
+            Wifi_Gui.scan_networks()  # Scan before hostapd takes over wlan0
             Rasp_Controller.start_ap_mode()
             Wifi_Gui.run_server()
             Rasp_Controller.stop_ap_mode()
@@ -83,14 +245,14 @@ if __name__ == "__main__":
 
         # If Wi-Fi priority is enabled, attempt to connect to the specified SSID
         if wifi_priority:
-            Rasp_Controller.connect_wifi_system_scope(ssid=wifi_ssid, pswd=wifi_password)
-            Log_Manager.log_message("info", "M00", "Enabling network priority")
+            wifi_action = Rasp_Controller.connect_wifi_system_scope(ssid=wifi_ssid, pswd=wifi_password)
+            Log_Manager.log_message("info", "M00", f"Enabling network priority (profile {wifi_action})")
         else:
             Rasp_Controller.restart_networkmanager()
             Log_Manager.log_message("info", "M00", "Automatically searching for available networks")
 
-        # Wait for 20 seconds to ensure network stability
-        time.sleep(20)
+        # Wait until wlan0 has an address, a default route and upstream reachability
+        Rasp_Controller.wait_until_ready(interface="wlan0", deadline=NETWORK_READY_TIMEOUT)
 
         # Check if the system is successfully connected to Wi-Fi
         if Rasp_Controller.is_wifi_connected():
@@ -98,6 +260,7 @@ if __name__ == "__main__":
             break  # Exit loop when successfully connected
         else:
             Log_Manager.log_message("error", "E00", "Unable to connect to the Internet")
+            Wifi_Gui.scan_networks()  # Scan before hostapd takes over wlan0
             Rasp_Controller.start_ap_mode()
             Wifi_Gui.run_server()
             Rasp_Controller.stop_ap_mode()
@@ -109,9 +272,19 @@ if __name__ == "__main__":
 
     if Rasp_Controller.is_wifi_connected():
 
+        # The hour check, file names and the RTC sync below need NTP time (None = cannot tell)
+        clock_synced = Wake_Cycle.wait_until("clock synced", lambda: clock_synchronized() is not False,
+                                             CLOCK_TIMEOUT)
+        if not clock_synced:
+            Log_Manager.log_message("error", "E00", "System clock not synchronized")
+
+        Wake_Cycle.enter("capture")
         current_hour = datetime.now().hour
 
         Log_Manager.log_message("info", "M00", "Network connection successful")
+        connectivity = Rasp_Controller.prober.probe()
+        if not connectivity["reachable"]:
+            Log_Manager.log_message("error", "E00", f"Upload server unreachable: {connectivity['probes']}")
 
         if current_hour in EXECUTION_HOURS and Rasp_Camera.picam2 is not None:
             try:
@@ -187,6 +360,8 @@ if __name__ == "__main__":
 # Sensor Data Collection & Image(.zip) Upload
 # ================================
 
+        Wake_Cycle.enter("upload")
+
         # Define WI-FI Object
         wifi_details = None
 
@@ -220,38 +395,126 @@ if __name__ == "__main__":
             
             Log_Manager.log_message("info", "M00", "Reading network signal strength")
 
-            # Upload sensor data to the server
-            Data_Uploader.upload_sensor_data(temperatures, humidities, lux_values, wifi_details)
-            Log_Manager.log_message("info", "M00", "Already upload sensor data")
-
-            # Compress all files in the upload directory
-            Data_Uploader.compress_each_file_in_directory(UPLOAD_DIR)
-            Log_Manager.log_message("info", "M00", "Compressing files for upload (.zip)")
-
-            # wait for record log
-            time.sleep(1)
+            # Spread the fleet's uploads instead of all nodes hitting the server at once
+            slot_delay = Data_Uploader.wait_for_upload_slot()
+            if slot_delay:
+                Log_Manager.log_message("info", "M00", f"Waited {slot_delay:.1f} s for upload slot")
 
-            # Upload all `.zip` files from the directory
             full_dir = Path(__file__).parent / UPLOAD_DIR
-            for zip_file in full_dir.glob("*.zip"):
-                response = Data_Uploader.upload_zip_file(zip_file)
-                print(f"Upload result for {zip_file.name}: {response}")
-            Log_Manager.log_message("info", "M00", "Successfully uploaded compressed file")
-                
-            Data_Uploader.clean_upload_files(full_dir)
-            print("Already clean zip and image")
-            Log_Manager.log_message("info", "M00", "Already clean zip and image")
-                
+            use_pipeline = UPLOAD_CONFIG.get("PIPELINE", False) and not UPLOAD_CONFIG.get("STREAMING", False) \
+                and UPLOAD_CONFIG.get("MODE", "PER_FILE") == "PER_FILE"
+
+            if use_pipeline:
+                # Telemetry, compression and uploads overlap; stops at the end of the wake budget
+                pipeline_result = Upload_Pipeline.run(full_dir, telemetry=(temperatures, humidities, lux_values, wifi_details),
+                                                      deadline=WAKE_BUDGET - (time.monotonic() - WAKE_START),
+                                                      wifi_details=wifi_details)
+                sensor_sent = pipeline_result["telemetry"]
+            else:
+                # Upload sensor data to the server
+                sensor_sent = Data_Uploader.upload_sensor_data(temperatures, humidities, lux_values, wifi_details)
+            if Data_Uploader.reliable:
+                udp_stats = Data_Uploader.udp_stats
+                Log_Manager.log_message("info", "M00", f"Sensor data delivery ratio: {udp_stats.get('delivery_ratio')}, RTT(ms): {udp_stats.get('rtt_ms')}")
+            if sensor_sent:
+                Log_Manager.log_message("info", "M00", "Already upload sensor data")
+            else:
+                Log_Manager.log_message("error", "E00", "Failed to upload sensor data")
+
+            if Data_Uploader.log_shipping == "INCREMENTAL":
+                # Send only log lines written since the last acknowledged upload
+                log_result = Data_Uploader.ship_log_increments(full_dir / "LOG")
+                Log_Manager.log_message("info", "M00", f"Shipped log increments: {log_result}")
+
+            if use_pipeline:
+                print(f"Pipeline result: {pipeline_result}")
+                Log_Manager.log_message("info", "M00", f"Upload stage timings: {pipeline_result['timings']}")
+                if pipeline_result["uploaded"]:
+                    Log_Manager.log_message("info", "M00", f"Successfully uploaded compressed file: {len(pipeline_result['uploaded'])}")
+                if pipeline_result["failed"] or pipeline_result["pending"]:
+                    Log_Manager.log_message("error", "E00", f"Upload pending in outbox: failed={pipeline_result['failed']}, deferred={pipeline_result['deferred']}, pending={pipeline_result['pending']}")
+
+                # Only items whose archive is queued or already uploaded; the rest stay for the next wake
+                Data_Uploader.clean_upload_files(full_dir, items=[item for item, zip_path in pipeline_result["compressed"].items()
+                                                                  if not zip_path.startswith(("ERROR:", "SKIPPED: compressed"))])
+                print("Already clean zip and image")
+                Log_Manager.log_message("info", "M00", "Already clean zip and image")
+
+            elif UPLOAD_CONFIG.get("STREAMING", False):
+                # Zip each item on the fly into the HTTP request (no .zip written to the SD card)
+                Log_Manager.log_message("info", "M00", "Streaming files for upload (.zip)")
+                stream_result = Data_Uploader.upload_directory_streaming(full_dir)
+                uploaded_items = [Path(item).name for item, (status_code, _) in stream_result.items() if status_code == 200]
+                failed_items = [Path(item).name for item, (status_code, _) in stream_result.items() if status_code != 200]
+                print(f"Streaming upload result: uploaded={uploaded_items}, failed={failed_items}")
+                if uploaded_items:
+                    Log_Manager.log_message("info", "M00", f"Successfully uploaded compressed file: {len(uploaded_items)}")
+                if failed_items:
+                    Log_Manager.log_message("error", "E00", f"Upload failed, kept for next wake: {failed_items}")
+
+                # Archives left in the outbox by earlier wakes
+                Upload_Outbox.process(Data_Uploader, scheduler=Upload_Scheduler,
+                                      remaining_seconds=WAKE_BUDGET - (time.monotonic() - WAKE_START),
+                                      wifi_details=wifi_details)
+
+                # Only delete what the server confirmed
+                Data_Uploader.clean_upload_files(full_dir, items=uploaded_items)
+                print("Already clean uploaded images")
+                Log_Manager.log_message("info", "M00", "Already clean uploaded images")
+
+            else:
+                if UPLOAD_CONFIG.get("MODE", "PER_FILE") == "BUNDLE":
+                    # One archive for the whole wake, with a JSON manifest
+                    bundle_path = Data_Uploader.build_bundle(full_dir, metadata={"camera": dict(CONFIG_DATA["CAMERA"])})
+                    Log_Manager.log_message("info", "M00", f"Bundling files for upload (.zip): {bundle_path}")
+                    clean_items = None
+                else:
+                    # Compress all files in the upload directory
+                    compress_result = Data_Uploader.compress_each_file_in_directory(UPLOAD_DIR)
+                    Log_Manager.log_message("info", "M00", "Compressing files for upload (.zip)")
+                    for item, zip_path in compress_result.items():
+                        if str(zip_path).startswith("ERROR:"):
+                            Log_Manager.log_message("error", "E00", f"Failed to compress {item}: {zip_path}")
+                    # Items that failed to compress (e.g. disk full) are kept for the next wake
+                    clean_items = [item for item, zip_path in compress_result.items()
+                                   if not str(zip_path).startswith("ERROR:")]
+                Log_Manager.log_message("info", "M00", f"Compression summary: {Data_Uploader.compression_policy.summary()}")
+
+                # wait for record log
+                time.sleep(1)
+
+                # Move all `.zip` files into the outbox, then upload everything that is due
+                for zip_file in full_dir.glob("*.zip"):
+                    Upload_Outbox.enqueue(zip_file)
+
+                # Send what fits into the remaining wake time; the rest waits for a later wake
+                upload_result = Upload_Outbox.process(Data_Uploader, scheduler=Upload_Scheduler,
+                                                      remaining_seconds=WAKE_BUDGET - (time.monotonic() - WAKE_START),
+                                                      wifi_details=wifi_details)
+                print(f"Upload result: {upload_result}")
+                if upload_result["uploaded"]:
+                    Log_Manager.log_message("info", "M00", f"Successfully uploaded compressed file: {len(upload_result['uploaded'])}")
+                if upload_result["failed"] or upload_result["deferred"]:
+                    Log_Manager.log_message("error", "E00", f"Upload pending in outbox: failed={upload_result['failed']}, deferred={upload_result['deferred']}")
+
+                Data_Uploader.clean_upload_files(full_dir, items=clean_items)
+                print("Already clean zip and image")
+                Log_Manager.log_message("info", "M00", "Already clean zip and image")
 
         finally:
-            # Close sensors and network connections
-            Sensor_Reader.close_sensors()
-            Log_Manager.log_message("info", "M00", "Sensor function disabled")
-            Data_Uploader.close()
-            Log_Manager.log_message("info", "M00", "Upload function disabled")
-
-            # Set RTC (synchronize time)
-            Log_Manager.sync_rtc()
+            # Close sensors and network connections (only those this wake built)
+            if Sensor_Reader.loaded:
+                Sensor_Reader.close_sensors()
+                Log_Manager.log_message("info", "M00", "Sensor function disabled")
+            if Data_Uploader.loaded:
+                Data_Uploader.close()
+                Log_Manager.log_message("info", "M00", "Upload function disabled")
+
+            # Set RTC (synchronize time); an unsynchronized clock would overwrite a good RTC
+            if clock_synced:
+                Log_Manager.sync_rtc()
+            else:
+                Log_Manager.log_message("error", "E00", "RTC not set: system clock not synchronized")
 
     else:
         print("Unable to connect to the Internet")
@@ -261,6 +524,20 @@ if __name__ == "__main__":
 # Shutdown PDS
 # ================================
 
-    print("Wait for 180 second...") 
-    time.sleep(180)
-    os.system("sudo shutdown -h now")
\ No newline at end of file
+    Wake_Cycle.enter("shutdown")
+
+    # Power off as soon as nothing is left to finish instead of after a fixed 180 s
+    Wake_Cycle.wait_until("uploads confirmed", uploads_settled, UPLOAD_TIMEOUT)
+
+    # Import and construction times and awake time per phase of this wake
+    print(f"Startup profile:\n{Startup_Profile.report()}")
+    Log_Manager.log_message("info", "M00", f"Startup profile: {Startup_Profile.totals()}")
+    print(f"Wake profile:\n{Wake_Cycle.report()}")
+    Log_Manager.log_message("info", "M00", f"Wake profile: {Wake_Cycle.summary()}")
+
+    Wake_Cycle.wait_until("logs flushed", logs_flushed, LOG_TIMEOUT)
+
+    if SHUTDOWN_LINGER:
+        print(f"Wait for {SHUTDOWN_LINGER} second...")
+        time.sleep(SHUTDOWN_LINGER)
+    os.system("sudo shutdown -h now")
@@ -0,0 +1,638 @@
+"""
+IngestServer Module: Local stand-in for the PDS ingest server.
+Decodes the telemetry datagrams sent by DataUploader (and acknowledges reliable
+ones) and accepts multipart archive uploads on RX_IMG.php, so upload code can be
+exercised without the production server. Latency, loss and a bandwidth cap can
+be injected, and received throughput is recorded.
+
+Run standalone (then set UPLOAD.SERVER_IP / SERVER_UDP_PORT / SERVER_HTTP_PORT):
+    python modules/HP_IngestServer.py --http-port 8080 --latency 0.1 --loss 0.05 --bandwidth 250000
+"""
+
+import os
+import sys
+import math
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+import random
+import socket
+import struct
+import datetime
+import argparse
+import threading
+from collections import OrderedDict
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upload endpoint path used by DataUploader
+RX_IMG_PATH = "/ipm_web/PEST_IMAGES/RX_IMG.php"
+RX_CHUNK_PATH = "/ipm_web/PEST_IMAGES/RX_CHUNK.php"
+RX_LOG_PATH = "/ipm_web/PEST_IMAGES/RX_LOG.php"
+
+# Must match the binary layout in HP_UploadServer
+BINARY_PACKET_MAGIC = b"PD"
+BINARY_HEADER = struct.Struct(">2sBI")
+BINARY_BODY_V1 = struct.Struct(">hHIBbhI")
+
+# Must match the reliable UDP framing in HP_UploadServer
+RELIABLE_DATA_MAGIC = b"RQ"
+RELIABLE_ACK_MAGIC = b"RA"
+RELIABLE_HEADER = struct.Struct(">2sBI")
+RELIABLE_ACK = struct.Struct(">2sI")
+
+
+def decode_telemetry(data):
+    """
+    Decode one telemetry datagram (legacy PD:ENVI, batched PD:ENVB or binary).
+
+    :param data: Raw datagram bytes.
+    :return: List of measurement dicts, one per reading (T, H or L).
+    :raises ValueError: If the datagram is not a known telemetry format.
+    """
+    if data.startswith(BINARY_PACKET_MAGIC) and not data.startswith(b"PD:"):
+        return _decode_binary(data)
+
+    fields = data.decode().split(":")
+    if len(fields) < 12 or fields[0] != "PD":
+        raise ValueError(f"Unknown telemetry datagram: {data[:32]!r}")
+
+    # Trailing fields shared by both text formats (the final ':' leaves an empty field)
+    location, _, link_quality, signal_level, cpu_temp, disk_space = fields[-7:-1]
+    common = {
+        "timestamp": fields[2],
+        "node": fields[3],
+        "location": location,
+        "link_quality": int(link_quality),
+        "signal_level": int(signal_level),
+        "cpu_temp": float(cpu_temp),
+        "disk_space": disk_space,
+    }
+
+    if fields[1] == "ENVI":
+        return [dict(common, type=fields[4], value=float(fields[5]))]
+
+    if fields[1] == "ENVB":
+        readings = []
+        for item in fields[4].split(";"):
+            kind, value = item.split("=")
+            readings.append(dict(common, type=kind, value=float(value)))
+        return readings
+
+    raise ValueError(f"Unknown telemetry type: {fields[1]}")
+
+
+def _decode_binary(data):
+    """
+    Decode a binary telemetry packet. Only version 1 is known.
+    """
+    magic, version, epoch = BINARY_HEADER.unpack_from(data, 0)
+    if version != 1:
+        raise ValueError(f"Unsupported binary packet version: {version}")
+
+    offset = BINARY_HEADER.size
+    temp, hum, lux, link_quality, signal_level, cpu_temp, disk_mib = BINARY_BODY_V1.unpack_from(data, offset)
+    offset += BINARY_BODY_V1.size
+    location_len = data[offset]
+    location = data[offset + 1:offset + 1 + location_len].decode()
+
+    common = {
+        "timestamp": datetime.datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H-%M-%S"),
+        "node": "1",
+        "location": location,
+        "link_quality": link_quality,
+        "signal_level": signal_level,
+        "cpu_temp": cpu_temp / 100,
+        "disk_space": f"{disk_mib}M",
+    }
+    return [
+        dict(common, type="T", value=temp / 100),
+        dict(common, type="H", value=hum / 100),
+        dict(common, type="L", value=lux / 100),
+    ]
+
+
+class TelemetryReceiver:
+    """
+    TelemetryReceiver: UDP listener that decodes and records telemetry datagrams.
+    Reliable ("RQ") frames are acknowledged and de-duplicated by (sender, sequence).
+    Loss and latency can be injected to emulate a weak link.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8000, loss_rate=0.0, latency=0.0, seed=None):
+        """
+        :param host: Address to bind.
+        :param port: UDP port to bind (0 picks a free port).
+        :param loss_rate: Probability (0-1) of dropping each inbound datagram and each ACK.
+        :param latency: One-way delay (seconds) applied to each ACK.
+        :param seed: Random seed for reproducible loss.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.5)
+        self.address = self.sock.getsockname()
+
+        self.loss_rate = loss_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+
+        self.datagrams = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.acks_sent = 0
+        self.measurements = []
+        self.errors = []
+        self.seen = OrderedDict()   # (sender, seq) of recent reliable frames
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Start receiving in a background thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        print(f"[INGEST] UDP telemetry receiver listening on {self.address[0]}:{self.address[1]}")
+
+    def serve(self):
+        """Receive loop: decode every datagram until stop() is called."""
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.handle_datagram(data, addr)
+
+    def handle_datagram(self, data, addr):
+        """
+        Decode a single datagram and record the result.
+        """
+        self.datagrams += 1
+        if self.random.random() < self.loss_rate:
+            self.dropped += 1
+            return
+
+        if data.startswith(RELIABLE_DATA_MAGIC):
+            _, _, seq = RELIABLE_HEADER.unpack_from(data, 0)
+            data = data[RELIABLE_HEADER.size:]
+            self.send_ack(seq, addr)
+
+            key = (addr, seq)
+            if key in self.seen:
+                self.duplicates += 1
+                return
+            self.seen[key] = True
+            if len(self.seen) > 4096:
+                self.seen.popitem(last=False)
+
+        try:
+            readings = decode_telemetry(data)
+            self.measurements.extend(readings)
+            for reading in readings:
+                print(f"[INGEST] {addr[0]} {reading['timestamp']} {reading['type']}={reading['value']}")
+        except (ValueError, UnicodeDecodeError, struct.error, IndexError) as e:
+            self.errors.append(str(e))
+            print(f"[INGEST] Bad datagram from {addr[0]}: {e}")
+
+    def send_ack(self, seq, addr):
+        """
+        Acknowledge a reliable frame, subject to the injected loss and latency.
+        """
+        if self.random.random() < self.loss_rate:
+            self.dropped += 1
+            return
+
+        ack = RELIABLE_ACK.pack(RELIABLE_ACK_MAGIC, seq)
+        if self.latency > 0:
+            timer = threading.Timer(self.latency, self._send_ack_now, args=(ack, addr))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._send_ack_now(ack, addr)
+
+    def _send_ack_now(self, ack, addr):
+        try:
+            self.sock.sendto(ack, addr)
+            self.acks_sent += 1
+        except OSError:
+            pass
+
+    def stop(self):
+        """Stop the receiver and close the socket."""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        self.sock.close()
+
+
+def parse_multipart(content_type, body):
+    """
+    Parse a multipart/form-data body.
+
+    :param content_type: Value of the request Content-Type header.
+    :param body: Raw request body (bytes).
+    :return: Dict of form field name -> (filename, payload bytes).
+    """
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        fields[name] = (part.get_filename(), part.get_payload(decode=True))
+    return fields
+
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by all connections, so concurrent uploads split one capped link.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: Bytes per second (0 or None disables the cap).
+        :param burst: Bucket size in bytes (defaults to 1/10 s of traffic).
+        """
+        self.rate = rate or 0
+        self.burst = burst or max(1, int(self.rate / 10))
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, size):
+        """
+        Block until `size` bytes may pass.
+        """
+        if self.rate <= 0:
+            return
+        while size > 0:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                take = min(size, self.tokens)
+                self.tokens -= take
+                size -= take
+                wait = 0 if size == 0 else min(size, self.burst) / self.rate
+            if wait:
+                time.sleep(wait)
+
+
+class ImageReceiver:
+    """
+    ImageReceiver: HTTP stand-in for RX_IMG.php. Accepts the multipart `file` field,
+    optionally saves it, and records per-request statistics.
+    Also serves RX_CHUNK.php, the reference receiver for DataUploader.upload_file_chunked,
+    and RX_LOG.php, which appends incremental log shipments (ship_log_increments).
+
+    Injected faults: `latency` before each answer, `loss_rate` of requests whose
+    connection is dropped without an answer after the body was read, and a shared
+    `bandwidth` cap on request bodies.
+    """
+
+    def __init__(self, host="127.0.0.1", port=80, save_dir=None, latency=0.0, chunk_dir=None,
+                 loss_rate=0.0, bandwidth=0, seed=None):
+        """
+        :param host: Address to bind.
+        :param port: TCP port to bind (0 picks a free port).
+        :param save_dir: Directory to store received archives (None keeps nothing).
+        :param latency: Delay (seconds) before answering each request.
+        :param chunk_dir: Directory for partial chunked uploads (survives restarts).
+        :param loss_rate: Probability (0-1) of dropping a request without an answer.
+        :param bandwidth: Upload cap in bytes/s over all connections (0 = unlimited).
+        :param seed: Random seed for reproducible loss.
+        """
+        self.save_dir = save_dir
+        self.latency = latency
+        self.chunk_dir = chunk_dir or tempfile.mkdtemp(prefix="rx_chunk_")
+        self.loss_rate = loss_rate
+        self.random = random.Random(seed)
+        self.limiter = BandwidthLimiter(bandwidth)
+        self.dropped = 0
+        self.uploads = []
+        self.logs = {}   # (location, file, generation) -> received bytes
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if urlsplit(self.path).path == RX_CHUNK_PATH:
+                    receiver.handle_chunk_query(self)
+                else:
+                    receiver.reply(self, 404, "Not Found")
+
+            def do_POST(self):
+                # The handler lives as long as the keep-alive connection
+                self.body = None
+                if receiver.drop(self):
+                    return
+                if urlsplit(self.path).path == RX_CHUNK_PATH:
+                    receiver.handle_chunk(self)
+                elif urlsplit(self.path).path == RX_LOG_PATH:
+                    receiver.handle_log(self)
+                else:
+                    receiver.handle_post(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.address = self.httpd.server_address
+        self.base_url = f"http://{self.address[0]}:{self.address[1]}"
+        self.thread = None
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"[INGEST] HTTP receiver listening on {self.base_url}{RX_IMG_PATH}")
+
+    def read_body(self, handler):
+        """
+        Read the request body (Content-Length or chunked transfer encoding),
+        paced by the bandwidth cap. The body is cached on the handler.
+        """
+        if getattr(handler, "body", None) is not None:
+            return handler.body
+
+        if "chunked" in handler.headers.get("Transfer-Encoding", "").lower():
+            parts = []
+            while True:
+                size = int(handler.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers up to the blank line
+                    while handler.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                parts.append(self.read_exact(handler, size))
+                handler.rfile.readline()
+            handler.body = b"".join(parts)
+            return handler.body
+
+        handler.body = self.read_exact(handler, int(handler.headers.get("Content-Length", 0)))
+        return handler.body
+
+    def read_exact(self, handler, size, block_size=16 * 1024):
+        parts = []
+        while size > 0:
+            self.limiter.consume(min(size, block_size))
+            block = handler.rfile.read(min(size, block_size))
+            if not block:
+                break
+            parts.append(block)
+            size -= len(block)
+        return b"".join(parts)
+
+    def drop(self, handler):
+        """
+        Injected loss: read the request, then close the connection without answering.
+
+        :return: True if the request was dropped.
+        """
+        if self.random.random() >= self.loss_rate:
+            return False
+        self.read_body(handler)
+        handler.close_connection = True
+        with self.lock:
+            self.dropped += 1
+        return True
+
+    def stats(self):
+        """
+        :return: Received throughput over all requests answered so far: request count,
+                 bytes, active seconds (first request start to last answer) and kbit/s,
+                 plus dropped requests and p50/p95 request time.
+        """
+        with self.lock:
+            uploads = list(self.uploads)
+        total = sum(item["bytes"] for item in uploads)
+        if uploads:
+            elapsed = max(item["end"] for item in uploads) - min(item["start"] for item in uploads)
+        else:
+            elapsed = 0.0
+        durations = sorted(item["end"] - item["start"] for item in uploads)
+        return {
+            "requests": len(uploads),
+            "dropped": self.dropped,
+            "bytes": total,
+            "seconds": round(elapsed, 3),
+            "throughput_kbps": round(total * 8 / 1000 / elapsed, 1) if elapsed > 0 else 0.0,
+            "p50_seconds": round(_percentile(durations, 50), 3),
+            "p95_seconds": round(_percentile(durations, 95), 3),
+        }
+
+    def handle_post(self, handler):
+        """
+        Handle one upload request and reply like RX_IMG.php.
+        """
+        start = time.monotonic()
+        url = urlsplit(handler.path)
+        if url.path != RX_IMG_PATH:
+            self.reply(handler, 404, "Not Found")
+            return
+
+        body = self.read_body(handler)
+        fields = parse_multipart(handler.headers.get("Content-Type", ""), body)
+        if "file" not in fields:
+            self.reply(handler, 400, "ERROR: missing file field")
+            return
+
+        filename, payload = fields["file"]
+        if self.save_dir:
+            os.makedirs(self.save_dir, exist_ok=True)
+            with open(os.path.join(self.save_dir, os.path.basename(filename)), "wb") as f:
+                f.write(payload)
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.connections.add(handler.client_address)
+            self.uploads.append({
+                "file": filename,
+                "bytes": len(payload),
+                "query": parse_qs(url.query),
+                "seconds": round(time.monotonic() - start, 3),
+                "start": start,
+                "end": time.monotonic(),
+            })
+        self.reply(handler, 200, f"OK {filename} {len(payload)}")
+
+    def chunk_path(self, query):
+        upload_id = query["upload_id"][0]
+        if not all(c in "0123456789abcdef" for c in upload_id):
+            raise ValueError("invalid upload_id")
+        return os.path.join(self.chunk_dir, f"{upload_id}.part")
+
+    def handle_chunk_query(self, handler):
+        """
+        Report how many bytes of an upload are already stored.
+        """
+        query = parse_qs(urlsplit(handler.path).query)
+        part_path = self.chunk_path(query)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        self.reply_json(handler, 200, {"offset": offset})
+
+    def handle_chunk(self, handler):
+        """
+        Append one verified chunk; finish the upload once all bytes are present.
+        """
+        start = time.monotonic()
+        query = parse_qs(urlsplit(handler.path).query)
+        body = self.read_body(handler)
+        upload_id = query["upload_id"][0]
+        name = os.path.basename(query["name"][0])
+        size = int(query["size"][0])
+        offset = int(query["offset"][0])
+
+        if hashlib.sha256(body).hexdigest() != handler.headers.get("X-Chunk-SHA256"):
+            self.reply_json(handler, 422, {"error": "chunk checksum mismatch"})
+            return
+
+        with self.lock:
+            part_path = self.chunk_path(query)
+            current = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            if offset != current or offset + len(body) > size:
+                self.reply_json(handler, 409, {"offset": current})
+                return
+
+            with open(part_path, "ab") as f:
+                f.write(body)
+            current += len(body)
+
+            complete = current == size
+            if complete:
+                with open(part_path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                if digest != upload_id:
+                    os.remove(part_path)
+                    self.reply_json(handler, 422, {"error": "file checksum mismatch", "offset": 0})
+                    return
+                if self.save_dir:
+                    os.makedirs(self.save_dir, exist_ok=True)
+                    os.replace(part_path, os.path.join(self.save_dir, name))
+                else:
+                    os.remove(part_path)
+
+            self.connections.add(handler.client_address)
+            self.uploads.append({
+                "file": name,
+                "bytes": len(body),
+                "query": query,
+                "seconds": round(time.monotonic() - start, 3),
+                "start": start,
+                "end": time.monotonic() + self.latency,
+                "chunk_offset": offset,
+                "complete": complete,
+            })
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self.reply_json(handler, 200, {"offset": current, "complete": complete})
+
+    def handle_log(self, handler):
+        """
+        Append a gzip log increment at the given offset. Repeats of bytes already held
+        are acknowledged without appending; gaps get 409 with the current offset.
+        """
+        start = time.monotonic()
+        query = parse_qs(urlsplit(handler.path).query)
+        data = gzip.decompress(self.read_body(handler))
+        key = (query["location"][0], query["file"][0], query["generation"][0])
+        offset = int(query["offset"][0])
+
+        with self.lock:
+            current = self.logs.setdefault(key, bytearray())
+            if offset > len(current):
+                self.reply_json(handler, 409, {"offset": len(current)})
+                return
+            if offset + len(data) > len(current):
+                del current[offset:]
+                current.extend(data)
+            self.connections.add(handler.client_address)
+            self.uploads.append({
+                "file": query["file"][0],
+                "bytes": len(data),
+                "query": query,
+                "seconds": round(time.monotonic() - start, 3),
+                "start": start,
+                "end": time.monotonic() + self.latency,
+            })
+            size = len(current)
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self.reply_json(handler, 200, {"offset": size})
+
+    def reply_json(self, handler, status, data):
+        self.reply(handler, status, json.dumps(data), content_type="application/json")
+
+    def reply(self, handler, status, text, content_type="text/plain"):
+        data = text.encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def stop(self):
+        """Stop serving and release the port."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _percentile(values, percent):
+    """
+    :return: Nearest-rank percentile of a sorted list (0.0 if empty).
+    """
+    if not values:
+        return 0.0
+    return values[max(1, math.ceil(percent / 100 * len(values))) - 1]
+
+
+def main(argv=None):
+    """
+    Run both receivers until interrupted and print received throughput.
+    """
+    parser = argparse.ArgumentParser(description="Local PDS ingest server (PD:ENVI UDP + RX_IMG.php)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--udp-port", type=int, default=8000)
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--save-dir", default=None, help="Keep received archives here")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each answer / ACK")
+    parser.add_argument("--loss", type=float, default=0.0, help="Drop probability for datagrams and requests")
+    parser.add_argument("--bandwidth", type=int, default=0, help="HTTP upload cap in bytes/s (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    telemetry = TelemetryReceiver(host=args.host, port=args.udp_port, loss_rate=args.loss,
+                                  latency=args.latency, seed=args.seed)
+    images = ImageReceiver(host=args.host, port=args.http_port, save_dir=args.save_dir, latency=args.latency,
+                           loss_rate=args.loss, bandwidth=args.bandwidth, seed=args.seed)
+    telemetry.start()
+    images.start()
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[INGEST] datagrams={telemetry.datagrams} dropped={telemetry.dropped} http={images.stats()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        telemetry.stop()
+        images.stop()
+    print(f"[INGEST] Final: measurements={len(telemetry.measurements)} http={images.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,4 @@
 import os
-import serial
 import logging
 from pathlib import Path
 from ruamel.yaml import YAML
@@ -40,13 +39,25 @@ class LogManager:
         errors_handler.setFormatter(logging.Formatter('%(message)s'))
         self.errors_logger.addHandler(errors_handler)
 
-        # Serial communication with the control board
-        self.serial_port = serial.Serial('/dev/serial0', 115200, timeout=1)
-        self.serial_port.reset_input_buffer()
+        # Serial communication with the control board (opened on first use, see serial_port)
+        self._serial_port = None
 
         # Set the absolute path of config.yaml
         self.config_file = config_file
 
+    @property
+    def serial_port(self):
+        """
+        Serial link to the control board. Opened on first access so runs that never
+        talk to the board (or hosts without /dev/serial0) do not pay for it.
+        """
+        if self._serial_port is None:
+            import serial
+
+            self._serial_port = serial.Serial('/dev/serial0', 115200, timeout=1)
+            self._serial_port.reset_input_buffer()
+        return self._serial_port
+
     def load_config(self):
         """
         Load a YAML configuration file using ruamel.yaml.
@@ -90,6 +101,23 @@ class LogManager:
         else:
             raise ValueError("Invalid log level. Use 'info' or 'error'.")
 
+    def flush(self):
+        """
+        Flush both log files and fsync them, so a following power-off cannot lose entries.
+
+        :return: True when everything reached the disk.
+        """
+        try:
+            for logger in (self.messages_logger, self.errors_logger):
+                for handler in logger.handlers:
+                    handler.flush()
+                    if getattr(handler, "stream", None) is not None:
+                        os.fsync(handler.stream.fileno())
+            return True
+        except (OSError, ValueError) as e:
+            print(f"Failed to flush logs: {e}")
+            return False
+
     def get_messages_log_path(self):
         """
         :return: The path to 'messages.log'.
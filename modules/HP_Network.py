@@ -1,16 +1,715 @@
 import re
+import os
+import json
 import time
-import requests
+import uuid
+import array
+import hashlib
+import fcntl
+import socket
+import select
+import struct
+import threading
 import subprocess
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+try:
+    import dbus
+except ImportError:  # python3-dbus not installed: nmcli subprocess fallback
+    dbus = None
+
+# Network backends (selected by NETWORK.BACKEND in config.yaml)
+BACKEND_AUTO = "AUTO"               # sysfs/procfs + NetworkManager D-Bus, subprocess fallback
+BACKEND_SUBPROCESS = "SUBPROCESS"   # iwconfig / ethtool / nmcli only
+
+# Link quality scale used when the driver's range (SIOCGIWRANGE) cannot be read;
+# brcmfmac reports quality out of 70 (iwconfig "x/70")
+WIRELESS_QUALITY_MAX = 70
+
+NM_BUS_NAME = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+NM_SETTINGS_PATH = "/org/freedesktop/NetworkManager/Settings"
+NM_STATE_CONNECTED_GLOBAL = 70
+
+# Single saved Wi-Fi profile managed by connect_wifi_system_scope
+WIFI_CONNECTION_NAME = "mywifi"
+
+# rtnetlink multicast groups watched while waiting for the network
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+SIOCGIFADDR = 0x8915
+SIOCGIWRANGE = 0x8B0B
+# Offset of max_qual.qual in struct iw_range (after throughput ... sensitivity)
+IW_RANGE_MAX_QUAL_OFFSET = 44
+
+
+class SysfsNetworkBackend:
+    """
+    Reads link details from /proc/net/wireless and /sys/class/net/<iface> without
+    forking iwconfig or ethtool. Returns the same dicts as get_network_details.
+    """
+
+    def __init__(self, proc_dir="/proc", sys_net_dir="/sys/class/net"):
+        self.proc_dir = proc_dir
+        self.sys_net_dir = sys_net_dir
+        self.quality_max = {}
+
+    def wireless_quality_max(self, interface):
+        """
+        :return: Link quality scale of the driver (the "b" of iwconfig's "Link Quality=a/b"),
+                 read once per interface; WIRELESS_QUALITY_MAX if it cannot be read.
+        """
+        if interface not in self.quality_max:
+            quality_max = wireless_range_max_quality(interface)
+            if quality_max is None:
+                return WIRELESS_QUALITY_MAX
+            self.quality_max[interface] = quality_max
+        return self.quality_max[interface]
+
+    def wireless_details(self, interface):
+        """
+        :return: {"Interface", "Link Quality" (percent), "Signal Level" (dBm)}, or None
+                 if the interface is not listed (not associated / no wireless extensions).
+        """
+        try:
+            with open(os.path.join(self.proc_dir, "net", "wireless"), "r") as f:
+                lines = f.readlines()[2:]
+        except OSError:
+            return None
+
+        for line in lines:
+            name, _, rest = line.partition(":")
+            if name.strip() != interface:
+                continue
+            # status, link, level, noise, ...
+            fields = rest.split()
+            quality = float(fields[1].rstrip("."))
+            level = float(fields[2].rstrip("."))
+            if level > 0:
+                # Some drivers report the level as an unsigned byte
+                level -= 256
+            return {
+                "Interface": interface,
+                "Link Quality": int(quality / self.wireless_quality_max(interface) * 100),
+                "Signal Level": int(level),
+            }
+        return None
+
+    def ethernet_details(self, interface):
+        """
+        :return: {"Interface", "Link Detected", "Speed" (Mbps)}, or None if the
+                 interface does not exist.
+        """
+        base = os.path.join(self.sys_net_dir, interface)
+        if not os.path.isdir(base):
+            return None
+        carrier = _read_sysfs(os.path.join(base, "carrier"))
+        speed = _read_sysfs(os.path.join(base, "speed"))
+        return {
+            "Interface": interface,
+            "Link Detected": carrier == "1" if carrier is not None else None,
+            "Speed": int(speed) if speed is not None and int(speed) > 0 else None,
+        }
+
+    def get_network_details(self, interface):
+        if interface.startswith("wlan"):
+            return self.wireless_details(interface)
+        if interface.startswith("eth"):
+            return self.ethernet_details(interface)
+        return None
+
+
+class NetworkManagerDBus:
+    """
+    Minimal NetworkManager client over the system D-Bus (python3-dbus).
+    `available` is False when the library, the bus or NetworkManager is missing.
+    """
 
-class RaspController:
     def __init__(self):
+        self.bus = None
+        if dbus is not None:
+            try:
+                self.bus = dbus.SystemBus()
+            except dbus.exceptions.DBusException as e:
+                print(f"System D-Bus unavailable: {e}")
+
+    @property
+    def available(self):
+        try:
+            return self.bus is not None and bool(self.bus.name_has_owner(NM_BUS_NAME))
+        except dbus.exceptions.DBusException:
+            return False
+
+    def _interface(self, path, interface):
+        return dbus.Interface(self.bus.get_object(NM_BUS_NAME, path), interface)
+
+    def state(self):
+        """
+        :return: NetworkManager state (70 = connected global, see NMState).
+        """
+        properties = self._interface(NM_PATH, "org.freedesktop.DBus.Properties")
+        return int(properties.Get(NM_BUS_NAME, "State"))
+
+    def connections(self):
+        """
+        :return: Saved connection profiles as {"path", "id", "uuid", "type", "ssid", "key_mgmt", "settings"}.
+        """
+        settings = self._interface(NM_SETTINGS_PATH, f"{NM_BUS_NAME}.Settings")
+        profiles = []
+        for path in settings.ListConnections():
+            config = self._interface(path, f"{NM_BUS_NAME}.Settings.Connection").GetSettings()
+            wireless = config.get("802-11-wireless", {})
+            profiles.append({
+                "path": path,
+                "id": str(config["connection"]["id"]),
+                "uuid": str(config["connection"]["uuid"]),
+                "type": str(config["connection"]["type"]),
+                "ssid": bytes(wireless.get("ssid", [])).decode(errors="replace"),
+                "key_mgmt": str(config.get("802-11-wireless-security", {}).get("key-mgmt", "")),
+                "settings": config,
+            })
+        return profiles
+
+    def delete_connection(self, path):
+        self._interface(path, f"{NM_BUS_NAME}.Settings.Connection").Delete()
+
+    def add_wifi_connection(self, name, ssid, psk, interface="wlan0", connection_uuid=None):
+        """
+        Save a WPA-PSK profile (same settings as the nmcli path).
+
+        :param connection_uuid: UUID of the new profile (random if None).
+        :return: D-Bus path of the new connection.
+        """
+        settings = self._interface(NM_SETTINGS_PATH, f"{NM_BUS_NAME}.Settings")
+        return settings.AddConnection({
+            "connection": {"id": name, "type": "802-11-wireless", "uuid": connection_uuid or str(uuid.uuid4()),
+                           "interface-name": interface},
+            "802-11-wireless": {"ssid": dbus.ByteArray(ssid.encode()), "mode": "infrastructure"},
+            "802-11-wireless-security": {"key-mgmt": "wpa-psk", "psk": psk},
+            "ipv4": {"method": "auto"},
+            "ipv6": {"method": "auto"},
+        })
+
+    def update_wifi_credentials(self, profile, ssid, psk):
+        """
+        Change SSID and PSK of an existing profile in place (UUID and seen BSSIDs are kept).
+        """
+        settings = profile["settings"]
+        settings["802-11-wireless"]["ssid"] = dbus.ByteArray(ssid.encode())
+        security = settings.setdefault("802-11-wireless-security", {})
+        security["key-mgmt"] = "wpa-psk"
+        security["psk"] = psk
+        self._interface(profile["path"], f"{NM_BUS_NAME}.Settings.Connection").Update(settings)
+
+    def active_connection(self, interface="wlan0"):
+        """
+        :return: D-Bus path of the profile activated on `interface`, or None.
+        """
+        manager = self._interface(NM_PATH, NM_BUS_NAME)
+        device = manager.GetDeviceByIpIface(interface)
+        device_properties = self._interface(device, "org.freedesktop.DBus.Properties")
+        active = device_properties.Get(f"{NM_BUS_NAME}.Device", "ActiveConnection")
+        if active == "/":
+            return None
+        active_properties = self._interface(active, "org.freedesktop.DBus.Properties")
+        # NMActiveConnectionState 2 = activated
+        if int(active_properties.Get(f"{NM_BUS_NAME}.Connection.Active", "State")) != 2:
+            return None
+        return active_properties.Get(f"{NM_BUS_NAME}.Connection.Active", "Connection")
+
+    def activate(self, connection_path, interface="wlan0"):
+        """
+        Start activating a connection on an interface (returns without waiting).
+
+        :return: D-Bus path of the active connection.
+        """
+        manager = self._interface(NM_PATH, NM_BUS_NAME)
+        device = manager.GetDeviceByIpIface(interface)
+        return manager.ActivateConnection(connection_path, device, "/")
+
+
+class ConnectivityProber:
+    """
+    Races cheap reachability probes in parallel, each with a short timeout:
+      - "server":  TCP connect to the upload server port
+      - "dns":     resolver lookup of `dns_host`
+      - "gateway": default gateway in the ARP table, else a TCP connect to it
+                   (a refused connection also proves the gateway answers)
+    Only the server and DNS probes prove upstream (WAN) access; the gateway probe
+    only proves the local link. The result is cached for `ttl` seconds.
+
+    Each probe runs in its own short-lived daemon thread, so a lookup that hangs past
+    the race (getaddrinfo has no timeout) cannot starve later probes. While a DNS
+    lookup is still running, the next race waits on it instead of starting another.
+    """
+
+    def __init__(self, server_host="59.125.195.194", server_port=80, dns_host="google.com",
+                 timeout=1.5, ttl=10.0, proc_dir="/proc"):
+        """
+        :param server_host: Upload server address.
+        :param server_port: Upload server TCP port.
+        :param dns_host: Name resolved by the DNS probe.
+        :param timeout: Per-probe timeout (seconds).
+        :param ttl: Seconds a result is reused.
+        :param proc_dir: procfs mount (net/route, net/arp).
+        """
+        self.server_host = server_host
+        self.server_port = server_port
+        self.dns_host = dns_host
+        self.timeout = timeout
+        self.ttl = ttl
+        self.proc_dir = proc_dir
+        self.dns_future = None
+        self.cached = None
+        self.cached_at = 0.0
+
+    def probe(self, force=False):
+        """
+        :param force: Ignore the cached result.
+        :return: {"reachable": upload server answered,
+                  "online": upload server or DNS answered (upstream access),
+                  "link": any probe answered (the gateway at least),
+                  "latency_ms": time until the result was decided,
+                  "probes": {name: {"ok", "latency_ms", "error"} or None if not finished}}
+        """
+        now = time.monotonic()
+        if not force and self.cached is not None and now - self.cached_at < self.ttl:
+            return self.cached
+
+        start = time.monotonic()
+        if self.dns_future is None or self.dns_future.done():
+            self.dns_future = self._start("dns", self._probe_dns)
+        futures = {
+            self._start("server", self._probe_server): "server",
+            self.dns_future: "dns",
+            self._start("gateway", self._probe_gateway): "gateway",
+        }
+        probes = dict.fromkeys(futures.values())
+        pending = set(futures)
+        deadline = start + self.timeout + 0.5
+        while pending and not self._decided(probes):
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                probes[futures[future]] = future.result()
+
+        ok = {name: bool(probe and probe["ok"]) for name, probe in probes.items()}
+        online = ok["server"] or ok["dns"]
+        result = {
+            "reachable": ok["server"],
+            "online": online,
+            "link": online or ok["gateway"],
+            "latency_ms": round((time.monotonic() - start) * 1000, 1),
+            "probes": probes,
+        }
+        self.cached, self.cached_at = result, time.monotonic()
+        return result
+
+    @staticmethod
+    def _decided(probes):
+        """
+        :return: True once "reachable" and "online" can no longer change: the server probe
+                 finished, and it succeeded or the DNS probe finished too.
+        """
+        server, dns = probes["server"], probes["dns"]
+        if server is None:
+            return False
+        return server["ok"] or dns is not None
+
+    def _start(self, name, probe):
+        """
+        Run `probe` in a new daemon thread.
+
+        :return: Future resolved with the _timed() result.
+        """
+        future = Future()
+
+        def run():
+            result = {"ok": False, "latency_ms": None, "error": "probe did not finish"}
+            try:
+                result = self._timed(probe)
+            finally:
+                future.set_result(result)
+
+        threading.Thread(target=run, name=f"probe-{name}", daemon=True).start()
+        return future
+
+    def _timed(self, probe):
+        start = time.monotonic()
+        try:
+            probe()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e) or type(e).__name__
+        return {"ok": ok, "latency_ms": round((time.monotonic() - start) * 1000, 1), "error": error}
+
+    def _probe_server(self):
+        with socket.create_connection((self.server_host, self.server_port), timeout=self.timeout):
+            pass
+
+    def _probe_dns(self):
+        # getaddrinfo has no timeout of its own; the race stops waiting after `timeout`
+        socket.getaddrinfo(self.dns_host, None, proto=socket.IPPROTO_TCP)
+
+    def _probe_gateway(self):
+        gateway = self.default_gateway()
+        if gateway is None:
+            raise OSError("no default route")
+        if self.arp_complete(gateway):
+            return
+        try:
+            with socket.create_connection((gateway, 53), timeout=self.timeout):
+                pass
+        except ConnectionRefusedError:
+            pass
+
+    def default_gateway(self, interface=None):
+        """
+        :param interface: Only accept a default route through this interface.
+        :return: IPv4 address of the default gateway from net/route, or None.
+        """
+        try:
+            with open(os.path.join(self.proc_dir, "net", "route"), "r") as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            return None
+        for line in lines:
+            fields = line.split()
+            if len(fields) <= 3 or (interface is not None and fields[0] != interface):
+                continue
+            # Destination 0.0.0.0 with the RTF_GATEWAY flag
+            if fields[1] == "00000000" and int(fields[3], 16) & 0x2:
+                return socket.inet_ntoa(struct.pack("<L", int(fields[2], 16)))
+        return None
+
+    def arp_complete(self, address):
+        """
+        :return: True if `address` has a resolved (complete) ARP entry.
+        """
+        try:
+            with open(os.path.join(self.proc_dir, "net", "arp"), "r") as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            return False
+        for line in lines:
+            fields = line.split()
+            if len(fields) > 2 and fields[0] == address and int(fields[2], 16) & 0x2:
+                return True
+        return False
+
+
+class NetworkReadiness:
+    """
+    Waits until an interface is usable: it has an IPv4 address, a default route
+    through it, and upstream reachability (ConnectivityProber). Re-checks on rtnetlink
+    address/route/link events, or polls with exponential backoff if netlink is
+    unavailable, until an overall deadline.
+    """
+
+    def __init__(self, prober, nm_dbus=None, min_interval=0.25, max_interval=4.0):
+        """
+        :param prober: ConnectivityProber used for the upstream check.
+        :param nm_dbus: Optional NetworkManagerDBus; its state is reported alongside.
+        :param min_interval: First polling interval (seconds).
+        :param max_interval: Polling interval cap (seconds).
+        """
+        self.prober = prober
+        self.nm_dbus = nm_dbus
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def check(self, interface):
+        """
+        :return: {"address", "gateway", "upstream"}; upstream (upload server or DNS
+                 answered) is only probed once address and route are present.
+        """
+        address = interface_address(interface)
+        gateway = self.prober.default_gateway(interface) if address else None
+        upstream = bool(gateway) and self.prober.probe(force=True)["online"]
+        return {"address": address, "gateway": gateway, "upstream": upstream}
+
+    def wait(self, interface="wlan0", deadline=20.0):
+        """
+        :param interface: Interface to wait for.
+        :param deadline: Overall time limit (seconds).
+        :return: {"ready", "elapsed", "checks", "events", "nm_state", plus the last check()}.
+        """
+        start = time.monotonic()
+        watcher = _open_netlink()
+        interval = self.min_interval
+        checks = events = 0
+        try:
+            while True:
+                status = self.check(interface)
+                checks += 1
+                remaining = deadline - (time.monotonic() - start)
+                if status["upstream"] or remaining <= 0:
+                    break
+
+                if watcher is not None and _wait_netlink(watcher, min(interval, remaining)):
+                    # Something changed: re-check now, restart the backoff
+                    events += 1
+                    interval = self.min_interval
+                else:
+                    if watcher is None:
+                        time.sleep(min(interval, remaining))
+                    interval = min(interval * 2, self.max_interval)
+        finally:
+            if watcher is not None:
+                watcher.close()
+
+        result = dict(status, ready=status["upstream"], elapsed=round(time.monotonic() - start, 2),
+                      checks=checks, events=events, nm_state=None)
+        if self.nm_dbus is not None and self.nm_dbus.available:
+            try:
+                result["nm_state"] = self.nm_dbus.state()
+            except dbus.exceptions.DBusException:
+                pass
+        return result
+
+
+class WifiScanner:
+    """
+    Wi-Fi scanner for the configuration portal. A scan takes the radio off-channel and
+    disrupts the clients of the AP hosted on the same interface, so networks are scanned
+    once before hostapd starts (refresh()) and afterwards only when the portal asks for
+    it (trigger()), at most once every `min_interval` seconds. Triggered scans run in a
+    daemon thread and results are cached, so HTTP requests never wait for a scan.
+
+    Scans with `iw ... scan ap-force` (NetworkManager is stopped while the AP runs).
+    """
+
+    def __init__(self, interface="wlan0", min_interval=30.0):
+        self.interface = interface
+        self.min_interval = min_interval
+        self.results = []
+        self.updated = None
+        self.last_scan = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Start a fresh scan thread. A thread left from an earlier session keeps its own
+        events, so a quick stop()/start() cannot make the new thread exit.
+        """
+        self.stop()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(self.wakeup, self.stopped), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+    def trigger(self):
+        """Ask for a rescan (rate limited to one per `min_interval`)."""
+        self.wakeup.set()
+
+    def run(self, wakeup, stopped):
+        while not stopped.is_set():
+            wakeup.wait()
+            if stopped.is_set():
+                return
+            # Triggers arriving within `min_interval` of the last scan share the next one
+            if self.last_scan is not None:
+                delay = self.last_scan + self.min_interval - time.monotonic()
+                if delay > 0 and stopped.wait(delay):
+                    return
+            wakeup.clear()
+            self.refresh()
+
+    def refresh(self):
+        """
+        Scan now in the calling thread (e.g. before hostapd takes over the interface).
+
+        :return: True if the scan succeeded and the cached list was replaced.
+        """
+        self.last_scan = time.monotonic()
+        results = self.scan()
+        if results is None:
+            return False
+        with self.lock:
+            self.results = results
+            self.updated = time.time()
+        return True
+
+    def networks(self):
+        """
+        :return: Visible networks, one per SSID (strongest BSS), strongest first:
+                 [{"ssid", "signal" (dBm), "quality" (percent), "security"}]
+        """
+        with self.lock:
+            results = list(self.results)
+        best = {}
+        for network in results:
+            if network["ssid"] and (network["ssid"] not in best or network["signal"] > best[network["ssid"]]["signal"]):
+                best[network["ssid"]] = network
+        return sorted(best.values(), key=lambda network: network["signal"], reverse=True)
+
+    def scan(self):
+        """
+        :return: List of scanned BSS dicts, or None if the scan failed.
+        """
+        try:
+            result = subprocess.run(["sudo", "iw", "dev", self.interface, "scan", "ap-force"],
+                                    capture_output=True, text=True, check=True, timeout=20)
+            return parse_iw_scan(result.stdout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+            print(f"Wi-Fi scan failed: {e}")
+            return None
+
+
+def parse_iw_scan(output):
+    """
+    Parse `iw dev <iface> scan` output.
+
+    :return: [{"ssid", "signal", "quality", "security"}] per BSS.
+    """
+    networks = []
+    network = None
+    for line in output.splitlines():
+        text = line.strip()
+        if line.startswith("BSS "):
+            network = {"ssid": "", "signal": -100, "privacy": False, "rsn": False, "wpa": False, "sae": False}
+            networks.append(network)
+        elif network is None:
+            continue
+        elif text.startswith("SSID:"):
+            network["ssid"] = text[5:].strip()
+        elif text.startswith("signal:"):
+            network["signal"] = int(float(text.split()[1]))
+        elif text.startswith("capability:"):
+            network["privacy"] = "Privacy" in text
+        elif text.startswith("RSN:"):
+            network["rsn"] = True
+        elif text.startswith("WPA:"):
+            network["wpa"] = True
+        elif "Authentication suites:" in text and "SAE" in text:
+            network["sae"] = True
+
+    parsed = []
+    for network in networks:
+        if network["sae"]:
+            security = "WPA3"
+        elif network["rsn"]:
+            security = "WPA2"
+        elif network["wpa"]:
+            security = "WPA"
+        elif network["privacy"]:
+            security = "WEP"
+        else:
+            security = "Open"
+        parsed.append({"ssid": network["ssid"], "signal": network["signal"],
+                       "quality": _dbm_to_quality(network["signal"]), "security": security})
+    return parsed
+
+
+def _dbm_to_quality(signal):
+    """
+    :return: Signal quality in percent (-100 dBm -> 0, -50 dBm -> 100), as NetworkManager reports it.
+    """
+    return max(0, min(100, 2 * (signal + 100)))
+
+
+def interface_address(interface):
+    """
+    :return: IPv4 address of `interface` (SIOCGIFADDR), or None if it has none.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            data = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, struct.pack("256s", interface[:15].encode()))
+        except OSError:
+            return None
+    return socket.inet_ntoa(data[20:24])
+
+
+def wireless_range_max_quality(interface):
+    """
+    :return: max_qual.qual of the driver's wireless range (SIOCGIWRANGE), or None if the
+             interface has no wireless extensions or reports no scale.
+    """
+    buffer = array.array("B", bytes(4096))
+    address, length = buffer.buffer_info()
+    # struct iwreq: interface name, then struct iw_point {pointer, length, flags}
+    request = struct.pack("16sPHH", interface[:15].encode(), address, length, 0).ljust(32, b"\0")
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            fcntl.ioctl(sock.fileno(), SIOCGIWRANGE, request)
+        except OSError:
+            return None
+    return buffer[IW_RANGE_MAX_QUAL_OFFSET] or None
+
+
+def _open_netlink():
+    """
+    :return: rtnetlink socket subscribed to link, IPv4 address and route changes, or None.
+    """
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+        sock.setblocking(False)
+        return sock
+    except (OSError, AttributeError):
+        return None
+
+
+def _wait_netlink(sock, timeout):
+    """
+    Wait for rtnetlink messages and drain them.
+
+    :return: True if at least one event arrived within `timeout`.
+    """
+    readable, _, _ = select.select([sock], [], [], max(0.0, timeout))
+    if not readable:
+        return False
+    try:
+        while sock.recv(65536):
+            pass
+    except (BlockingIOError, OSError):
+        pass
+    return True
+
+
+def _read_sysfs(path):
+    """
+    :return: Stripped attribute value, or None if it cannot be read (e.g. speed of a down link).
+    """
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class RaspController:
+    def __init__(self, backend=BACKEND_AUTO, server_host="59.125.195.194", server_port=80,
+                 wifi_state_path="upload_state/wifi_profile.json"):
         """
         Initializes the RaspController.
         Assumes usage of NetworkManager and hostapd for managing AP mode
         on a Linux environment (e.g., Raspberry Pi).
+
+        :param backend: "AUTO" reads sysfs/procfs and uses NetworkManager over D-Bus,
+                        falling back to iwconfig/ethtool/nmcli; "SUBPROCESS" always forks the tools.
+        :param server_host: Upload server probed by is_wifi_connected.
+        :param server_port: Upload server TCP port.
+        :param wifi_state_path: JSON file remembering which credentials the "mywifi" profile holds
+                                (NetworkManager only returns saved secrets to root).
         """
-        print("RaspAPController initialized")
+        self.backend = backend.upper()
+        self.wifi_state_path = wifi_state_path
+        self.sysfs = SysfsNetworkBackend()
+        self.nm_dbus = NetworkManagerDBus() if self.backend == BACKEND_AUTO else None
+        self.prober = ConnectivityProber(server_host=server_host, server_port=server_port)
+        self.readiness = NetworkReadiness(self.prober, self.nm_dbus)
+        print(f"RaspAPController initialized ({self.backend} network backend)")
 
     def start_ap_mode(self):
         """
@@ -42,8 +741,109 @@ class RaspController:
 
     def connect_wifi_system_scope(self, ssid, pswd):
         """
+        Make the "mywifi" profile match the configured network and bring it up.
+
+        Idempotent: a profile that already has this SSID and password is reused, and
+        left alone if it is active (keeping its DHCP lease); a profile with other
+        credentials is modified in place (keeping its UUID and seen BSSIDs) instead
+        of being deleted and re-added. Saved secrets cannot be read without root, so
+        the password is compared with a hash stored in `wifi_state_path` when the
+        profile was last written. Other saved Wi-Fi profiles are removed once the
+        profile is active.
+
         :param ssid: Target Wi-Fi network name (SSID).
         :param pswd: Wi-Fi password.
+        :return: "active" (already up), "activated", "modified" or "created"; None on failure.
+        """
+        if self.nm_dbus is not None and self.nm_dbus.available:
+            try:
+                return self._connect_wifi_dbus(ssid, pswd)
+            except dbus.exceptions.DBusException as e:
+                print(f"D-Bus connect failed, falling back to nmcli: {e}")
+        return self._connect_wifi_nmcli(ssid, pswd)
+
+    def _credentials_digest(self, ssid, pswd):
+        return hashlib.sha256(f"{ssid}\0{pswd}".encode()).hexdigest()
+
+    def _profile_matches(self, profile_uuid, saved_ssid, key_mgmt, ssid, pswd):
+        """
+        :return: True if the profile was last written by us with these credentials.
+        """
+        try:
+            with open(self.wifi_state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (saved_ssid == ssid and key_mgmt == "wpa-psk" and state.get("uuid") == profile_uuid
+                and state.get("credentials") == self._credentials_digest(ssid, pswd))
+
+    def _save_profile_state(self, profile_uuid, ssid, pswd):
+        """
+        Remember the credentials written to the profile (temp file + fsync + rename).
+        """
+        os.makedirs(os.path.dirname(self.wifi_state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.wifi_state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"uuid": profile_uuid, "credentials": self._credentials_digest(ssid, pswd)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.wifi_state_path)
+
+    def _connect_wifi_dbus(self, ssid, pswd, conn_name=WIFI_CONNECTION_NAME, activation_timeout=30.0):
+        """
+        connect_wifi_system_scope over D-Bus (NetworkManager is already running).
+
+        :param activation_timeout: Seconds to wait for the profile to become active before
+                                   the other Wi-Fi profiles are removed.
+        """
+        profile = None
+        others = []
+        for candidate in self.nm_dbus.connections():
+            if candidate["type"] != "802-11-wireless":
+                continue
+            if candidate["id"] == conn_name and profile is None:
+                profile = candidate
+            else:
+                others.append(candidate)
+
+        if profile is None:
+            profile_uuid = str(uuid.uuid4())
+            path = self.nm_dbus.add_wifi_connection(conn_name, ssid, pswd, connection_uuid=profile_uuid)
+            self._save_profile_state(profile_uuid, ssid, pswd)
+            action = "created"
+        elif self._profile_matches(profile["uuid"], profile["ssid"], profile["key_mgmt"], ssid, pswd):
+            path = profile["path"]
+            if self.nm_dbus.active_connection() == path:
+                print(f"Wi-Fi already connected: {ssid} (Connection Name: {conn_name})")
+                self._delete_dbus_profiles(others)
+                return "active"
+            action = "activated"
+        else:
+            path = profile["path"]
+            self.nm_dbus.update_wifi_credentials(profile, ssid, pswd)
+            self._save_profile_state(profile["uuid"], ssid, pswd)
+            action = "modified"
+
+        self.nm_dbus.activate(path)
+        print(f"Activating Wi-Fi: {ssid} (Connection Name: {conn_name}, {action})")
+
+        deadline = time.monotonic() + activation_timeout
+        while self.nm_dbus.active_connection() != path:
+            if time.monotonic() >= deadline:
+                print(f"Wi-Fi {conn_name} not active after {activation_timeout} s, keeping other profiles")
+                return action
+            time.sleep(0.5)
+        self._delete_dbus_profiles(others)
+        return action
+
+    def _delete_dbus_profiles(self, profiles):
+        for profile in profiles:
+            self.nm_dbus.delete_connection(profile["path"])
+            print(f"Deleted Wi-Fi connection: {profile['id']}")
+
+    def _connect_wifi_nmcli(self, ssid, pswd, conn_name=WIFI_CONNECTION_NAME):
+        """
+        connect_wifi_system_scope through nmcli.
         """
         try:
             # 1.Ensure NetworkManager is running
@@ -54,37 +854,76 @@ class RaspController:
                 ["nmcli", "-t", "-f", "NAME,TYPE", "connection", "show"],
                 capture_output=True, text=True, check=True
             )
+            wifi_connections = []
+            for line in result.stdout.strip().split("\n"):
+                name, _, conn_type = line.rpartition(":")
+                if conn_type in ("802-11-wireless", "wifi"):
+                    wifi_connections.append(name.replace("\\:", ":"))
 
-            # Parse the output and filter Wi-Fi connection names
-            connections = result.stdout.strip().split("\n")
-            wifi_connections = [line.split(":")[0] for line in connections if "wifi" in line]
-
-            # 3.Delete all existing Wi-Fi connections (but keep SSID passwords intact)
-            for conn in wifi_connections:
-                subprocess.run(["nmcli", "connection", "delete", conn], check=False)
-                print(f"Deleted Wi-Fi connection: {conn}")
+            if conn_name not in wifi_connections:
+                # 3.Create the Wi-Fi connection with the specified SSID and password
+                subprocess.run([
+                    "nmcli", "connection", "add",
+                    "type", "wifi",
+                    "ifname", "wlan0",
+                    "con-name", conn_name,
+                    "ssid", ssid,
+                    "802-11-wireless-security.key-mgmt", "wpa-psk",
+                    "wifi-sec.psk", pswd
+                ], check=True)
+                self._save_profile_state(self._nmcli_profile(conn_name)["uuid"], ssid, pswd)
+                action = "created"
+            else:
+                # 3.Compare SSID, key management and the stored credentials hash
+                profile = self._nmcli_profile(conn_name)
+                if self._profile_matches(profile["uuid"], profile["ssid"], profile["key_mgmt"], ssid, pswd):
+                    if profile["state"] == "activated":
+                        print(f"Wi-Fi already connected: {ssid} (Connection Name: {conn_name})")
+                        self._delete_nmcli_profiles(wifi_connections, conn_name)
+                        return "active"
+                    action = "activated"
+                else:
+                    subprocess.run([
+                        "nmcli", "connection", "modify", conn_name,
+                        "802-11-wireless.ssid", ssid,
+                        "802-11-wireless-security.key-mgmt", "wpa-psk",
+                        "wifi-sec.psk", pswd
+                    ], check=True)
+                    self._save_profile_state(profile["uuid"], ssid, pswd)
+                    action = "modified"
 
-            # 4.Set a fixed Wi-Fi connection name (ensuring only one exists)
-            conn_name = "mywifi"
-
-            # 5.Create a new Wi-Fi connection with the specified SSID and password
-            subprocess.run([
-                "nmcli", "connection", "add",
-                "type", "wifi",
-                "ifname", "wlan0",
-                "con-name", conn_name,
-                "ssid", ssid,
-                "802-11-wireless-security.key-mgmt", "wpa-psk",
-                "wifi-sec.psk", pswd
-            ], check=True)
-
-            # 6.Activate the newly created Wi-Fi connection
+            # 4.Activate the Wi-Fi connection (nmcli waits until it is up)
             subprocess.run(["nmcli", "connection", "up", conn_name], check=True)
 
-            print(f"Successfully connected to Wi-Fi: {ssid} (Connection Name: {conn_name})")
+            # 5.Delete every other Wi-Fi connection (only the fixed name is kept)
+            self._delete_nmcli_profiles(wifi_connections, conn_name)
+
+            print(f"Successfully connected to Wi-Fi: {ssid} (Connection Name: {conn_name}, {action})")
+            return action
 
         except subprocess.CalledProcessError as e:
             print(f"Failed to connect to {ssid}. Error: {e}")
+            return None
+
+    def _nmcli_profile(self, conn_name):
+        """
+        :return: {"ssid", "key_mgmt", "uuid", "state"} of a saved profile (no secrets needed).
+        """
+        result = subprocess.run(
+            ["nmcli", "-g", "802-11-wireless.ssid,802-11-wireless-security.key-mgmt,connection.uuid,GENERAL.STATE",
+             "connection", "show", conn_name],
+            capture_output=True, text=True, check=True
+        )
+        # Terse output escapes ':' and backslashes inside values
+        fields = [field.replace("\\:", ":").replace("\\\\", "\\") for field in result.stdout.split("\n")]
+        fields += [""] * (4 - len(fields))
+        return {"ssid": fields[0], "key_mgmt": fields[1], "uuid": fields[2], "state": fields[3]}
+
+    def _delete_nmcli_profiles(self, wifi_connections, conn_name):
+        for conn in wifi_connections:
+            if conn != conn_name:
+                subprocess.run(["nmcli", "connection", "delete", conn], check=False)
+                print(f"Deleted Wi-Fi connection: {conn}")
 
     def enable_captive_portal(self):
         # restart dnsmasq
@@ -104,8 +943,10 @@ class RaspController:
     def get_network_details(self, interface="wlan0"):
         """
         Obtains network details based on the interface type.
-        - If it's a Wi-Fi interface (wlan0), it retrieves Link Quality and Signal Level using iwconfig.
-        - If it's a wired Ethernet interface (eth0), it retrieves Link Detected and Speed using ethtool.
+        - If it's a Wi-Fi interface (wlan0), it retrieves Link Quality and Signal Level
+          (from /proc/net/wireless, or iwconfig as fallback).
+        - If it's a wired Ethernet interface (eth0), it retrieves Link Detected and Speed
+          (from /sys/class/net, or ethtool as fallback).
         
         Returns a dictionary:
             For Wi-Fi (wlan0):
@@ -124,6 +965,16 @@ class RaspController:
         
         Returns None if the interface is invalid or data cannot be retrieved.
         """
+        if self.backend == BACKEND_AUTO:
+            details = self.sysfs.get_network_details(interface)
+            if details is not None:
+                return details
+        return self._get_network_details_subprocess(interface)
+
+    def _get_network_details_subprocess(self, interface="wlan0"):
+        """
+        get_network_details through iwconfig / ethtool.
+        """
         try:
             if interface.startswith("wlan"):  # Wi-Fi interface
                 result = subprocess.run(
@@ -183,34 +1034,130 @@ class RaspController:
             else:
                 return None  # Unknown interface
 
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, FileNotFoundError):
             return None  # Unable to execute command
     
-    def is_wifi_connected(self, test_url="http://google.com"):
-        """Check Wi-Fi connectivity by attempting to reach a known URL."""
-        try:
-            response = requests.get(test_url, timeout=5)
-            if response.status_code == 200:
-                return True
-        except requests.RequestException:
-            print("error", "Wi-Fi connection failed.")
-        return False
+    def wait_until_ready(self, interface="wlan0", deadline=20.0):
+        """
+        Wait until `interface` has an address, a default route and upstream
+        reachability, or the deadline passes (see NetworkReadiness.wait).
+        """
+        result = self.readiness.wait(interface, deadline)
+        print(f"Network {'ready' if result['ready'] else 'not ready'} after {result['elapsed']} s: {result}")
+        return result
 
+    def is_wifi_connected(self):
+        """
+        Check connectivity with the cached probe race (upload server, DNS, gateway).
+        True if the upload server or DNS answered; a gateway that only answers on the
+        local link (no WAN) does not count. See prober.probe() for the upload server itself.
+        """
+        result = self.prober.probe()
+        if not result["online"]:
+            print("error", f"Wi-Fi connection failed: {result['probes']}")
+        return result["online"]
 
-import os
-import signal
-import uvicorn
-import threading
+
+import copy
+import asyncio
 from ruamel.yaml import YAML
-from fastapi import FastAPI, Form, BackgroundTasks
-from fastapi.responses import HTMLResponse
+
+# fastapi and uvicorn are imported by WifiConfigGui itself: they cost ~0.4 s to import
+# and are only needed when the portal runs (RaspController users do not pay for them)
+
+
+class ConfigService:
+    """
+    ConfigService: Cached config.yaml document for the portal.
+    The parsed document is reused until the file's mtime or size changes; updates are
+    serialized, applied to a copy, written to a temporary file, fsynced and renamed over
+    config.yaml so a power cut never leaves a truncated file. The saved copy then replaces
+    the cached snapshot in one assignment, so reads never wait for a save in progress.
+    """
+
+    def __init__(self, config_file="config.yaml"):
+        self.config_file = config_file
+        self.yaml = YAML()
+        self.yaml.default_flow_style = False  # More human-readable style
+        self.lock = threading.Lock()
+        self.snapshot = (None, None)  # (document, signature), swapped as a whole
+
+    def _signature(self):
+        st = os.stat(self.config_file)
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        """
+        Reload the document if the file changed since it was cached (call with the lock held).
+        """
+        signature = self._signature()
+        document, cached = self.snapshot
+        if signature != cached:
+            with open(self.config_file, "r", encoding="utf-8") as f:
+                document = self.yaml.load(f)
+            self.snapshot = (document, signature)
+        return document
+
+    def get(self):
+        """
+        Lock-free when the cached snapshot is current or a save is in progress (the last
+        saved document is served); only a change made outside this service is re-read.
+
+        :return: The parsed config document (shared; do not modify), or None if missing.
+        """
+        try:
+            signature = self._signature()
+        except FileNotFoundError:
+            return None
+        document, cached = self.snapshot
+        if signature == cached:
+            return document
+        if not self.lock.acquire(blocking=document is None):
+            return document
+        try:
+            return self._load()
+        except FileNotFoundError:
+            return None
+        finally:
+            self.lock.release()
+
+    def update(self, mutate):
+        """
+        Apply `mutate(config)` to a copy of the current document and save it atomically.
+
+        :param mutate: Function changing the config in place; its return value is passed back.
+        :return: Return value of `mutate`.
+        :raises FileNotFoundError: If config.yaml does not exist.
+        """
+        with self.lock:
+            config = copy.deepcopy(self._load())
+            result = mutate(config)
+            tmp_path = f"{self.config_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                self.yaml.dump(config, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
+            self.snapshot = (config, self._signature())
+            return result
+
+    async def update_async(self, mutate):
+        """
+        update() in a worker thread, keeping file I/O and fsync off the event loop.
+        """
+        return await asyncio.to_thread(self.update, mutate)
+
 
 class WifiConfigGui:
-    def __init__(self, host: str = "10.3.141.1"):
+    def __init__(self, host: str = "10.3.141.1", config_file="config.yaml"):
         """
         Initialize the FastAPI app and set up the API routes.
         """
         self.host = host
+        self.config = ConfigService(config_file)
+        self.scanner = WifiScanner()
+        from fastapi import FastAPI
+
         self.app = FastAPI()
         self.setup_routes()
         self.html_content = self.load_html()
@@ -218,6 +1165,8 @@ class WifiConfigGui:
         self.ap_timeout = 240
         self.start_time = None
         self.running = False
+        self.server = None
+        self.timed_out = False
 
     def load_html(self):
         """
@@ -232,6 +1181,9 @@ class WifiConfigGui:
         """
         Set up FastAPI routes for rendering the Wi-Fi form and handling submission.
         """
+        from fastapi import Form, BackgroundTasks
+        from fastapi.responses import HTMLResponse
+
         @self.app.get("/", response_class=HTMLResponse)
         async def read_root():
             return self.html_content
@@ -242,8 +1194,9 @@ class WifiConfigGui:
             password: str = Form(...),
             background_tasks: BackgroundTasks = None
         ):
-            result = self.update_network_config(ssid, password)
+            result = await asyncio.to_thread(self.update_network_config, ssid, password)
             # If the update is successful, schedule a background task to shut down Uvicorn
+            # (background tasks run after the response has been sent)
             if result.get("message") == "Network parameters sent successfully!":
                 if background_tasks:
                     background_tasks.add_task(self.shutdown_server)
@@ -255,15 +1208,10 @@ class WifiConfigGui:
         @self.app.get("/get_priority")
         async def get_priority():
             """
-            Reads config.yaml and returns the current PRIORITY (true/false).
+            Returns the current PRIORITY (true/false) from the cached config.
             """
-            yaml_obj = YAML()
-            yaml_obj.default_flow_style = False
-
-            try:
-                with open("config.yaml", "r", encoding="utf-8") as f:
-                    config = yaml_obj.load(f)
-            except FileNotFoundError:
+            config = self.config.get()
+            if config is None:
                 return {"PRIORITY": False, "error": "config.yaml not found"}
 
             # Safely handle if 'PRIORITY' doesn't exist
@@ -276,56 +1224,58 @@ class WifiConfigGui:
         @self.app.post("/toggle_priority")
         async def toggle_priority():
             """
-            Reads config.yaml, flips the 'PRIORITY' boolean,
-            writes it back, and returns the new state.
+            Flips the 'PRIORITY' boolean in config.yaml (saved off the event loop)
+            and returns the new state.
             """
-            yaml_obj = YAML()
-            yaml_obj.default_flow_style = False
-            
+            def flip(config):
+                if "NETWORK" not in config:
+                    config["NETWORK"] = {}
+                config["NETWORK"]["PRIORITY"] = not config["NETWORK"].get("PRIORITY", False)
+                return config["NETWORK"]["PRIORITY"]
+
             try:
-                with open("config.yaml", "r", encoding="utf-8") as f:
-                    config = yaml_obj.load(f)
+                new_value = await self.config.update_async(flip)
             except FileNotFoundError:
                 return {"PRIORITY": False, "error": "config.yaml not found"}
-
-            if "NETWORK" not in config:
-                config["NETWORK"] = {}
-
-            current_value = config["NETWORK"].get("PRIORITY", False)
-            # Flip the boolean
-            new_value = not current_value
-            config["NETWORK"]["PRIORITY"] = new_value
-
-            # Write back to config.yaml
-            try:
-                with open("config.yaml", "w", encoding="utf-8") as f:
-                    yaml_obj.dump(config, f)
             except Exception as e:
-                return {"PRIORITY": current_value, "error": str(e)}
+                config = self.config.get() or {}
+                return {"PRIORITY": config.get("NETWORK", {}).get("PRIORITY", False), "error": str(e)}
 
             return {"PRIORITY": new_value}
 
+        @self.app.get("/networks")
+        async def networks(refresh: bool = False):
+            """
+            Returns nearby networks from the background scanner, strongest first.
+            """
+            if refresh:
+                self.scanner.trigger()
+            return {
+                "networks": self.scanner.networks(),
+                "updated": self.scanner.updated,
+            }
+
         @self.app.get("/generate_204", response_class=HTMLResponse)
         async def generate_204_page():
             return self.html_content
 
-    def update_network_config(self, new_ssid, new_password, config_file="config.yaml"):
+    def update_network_config(self, new_ssid, new_password, config_file=None):
         """
         Updates the 'SSID' and 'PASW' fields in the 'NETWORK' section
         of config.yaml using ruamel.yaml. Preserves original order and formatting.
+        Blocking (atomic save); the route runs it in a worker thread.
         
         :param new_ssid: The new Wi-Fi SSID to be saved.
         :param new_password: The new Wi-Fi password to be saved.
-        :param config_file: Path to the YAML config file (defaults to 'config.yaml').
+        :param config_file: Optional path overriding the portal's config file.
         :return: A dict with either {"message": "..."} or {"error": "..."}.
         """
-        yaml_obj = YAML()
-        yaml_obj.default_flow_style = False  # More human-readable style
+        service = self.config
+        if config_file is not None and config_file != service.config_file:
+            service = ConfigService(config_file)
 
-        try:
-            with open(config_file, "r", encoding="utf-8") as f:
-                config = yaml_obj.load(f)
-        except FileNotFoundError:
+        config = service.get()
+        if config is None:
             print("'config.yaml' does not exist.")
             return {"error": "'config.yaml' not found."}
 
@@ -333,57 +1283,69 @@ class WifiConfigGui:
             print("'NETWORK' section not found in config.yaml.")
             return {"error": "'NETWORK' section not found in config.yaml."}
 
-        # Override SSID and password
-        config["NETWORK"]["SSID"] = new_ssid
-        config["NETWORK"]["PASW"] = new_password
+        def set_credentials(config):
+            # Override SSID and password
+            config["NETWORK"]["SSID"] = new_ssid
+            config["NETWORK"]["PASW"] = new_password
 
         try:
-            with open(config_file, "w", encoding="utf-8") as f:
-                yaml_obj.dump(config, f)
+            service.update(set_credentials)
             print("Network parameters updated successfully!")
             return {"message": "Network parameters sent successfully!"}
+        except FileNotFoundError:
+            print("'config.yaml' does not exist.")
+            return {"error": "'config.yaml' not found."}
         except Exception as e:
             print(f"Error writing to config.yaml: {e}")
             return {"error": f"Failed to update network config: {e}"}
 
+    def scan_networks(self):
+        """
+        Scan for nearby networks once, before start_ap_mode() hands wlan0 to hostapd;
+        while the portal runs, /networks?refresh=true asks for further (rate-limited) scans.
+        """
+        self.scanner.refresh()
+
     def run_server(self):
         """
-        Start the FastAPI service on port 8000 (default).
+        Start the FastAPI service on port 8000 (default) and block until it is stopped,
+        either by shutdown_server() or by the AP timeout. On timeout the Pi is shut down.
         """
+        import uvicorn
+
         self.running = True
+        self.timed_out = False
         self.start_time = time.time()
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host=self.host, port=8000))
 
-        threading.Thread(target=self.monitor_timeout, daemon=True).start()
+        timer = threading.Timer(self.ap_timeout, self.on_ap_timeout)
+        timer.daemon = True
+        timer.start()
+        self.scanner.start()
+        try:
+            self.server.run()
+        finally:
+            timer.cancel()
+            self.scanner.stop()
+            self.running = False
 
-        uvicorn.run(self.app, host=self.host, port=8000)
+        if self.timed_out:
+            os.system("sudo shutdown -h now")
 
-    def monitor_timeout(self):
+    def on_ap_timeout(self):
         """
-        Continuously monitor whether AP mode has timed out
+        Timer callback: nobody configured the network within `ap_timeout` seconds.
         """
-        while self.running:
-            elapsed_time = time.time() - self.start_time
-            if elapsed_time > self.ap_timeout:
-                print("AP mode times out rpi will be automatically shut down...")
-                self.shutdown_server()
-                time.sleep(10)
-                os.system("sudo shutdown -h now") 
-                break
-            time.sleep(5)
-            
+        print("AP mode times out rpi will be automatically shut down...")
+        self.timed_out = True
+        self.shutdown_server()
 
     def shutdown_server(self):
         """
-        Background task that:
-          1) Waits 3 seconds to allow the HTTP response to reach the user
-          2) Restarts NetworkManager
-          3) Sends an interrupt signal to stop the Uvicorn server (instead of sys.exit())
+        Ask uvicorn to exit. As a background task of /configure_wifi/ this runs once the
+        response has been sent; uvicorn then closes its listener, lets open connections
+        finish and run_server() returns, so the caller can switch back to station mode.
         """
         self.running = False
-        time.sleep(3)
-        try:
-            # Send SIGINT to self process to stop uvicorn.run()
-            os.kill(os.getpid(), signal.SIGINT)  # Simulates Ctrl+C
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to restart NetworkManager: {e}")
-
+        if self.server is not None:
+            self.server.should_exit = True
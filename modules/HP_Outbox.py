@@ -0,0 +1,356 @@
+"""
+Outbox Module: Durable on-disk queue for upload archives.
+Archives stay in the outbox until the server confirms them with HTTP 200;
+failed items are retried on later wakes with exponential backoff.
+UploadLedger remembers, by content hash, which source files were already
+compressed, queued or acknowledged, so an interrupted wake is not redone.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+
+# Upload priority (lower is sent first)
+PRIORITY_LOG = 0
+PRIORITY_THUMBNAIL = 1
+PRIORITY_IMAGE = 2
+
+
+class UploadOutbox:
+    """
+    UploadOutbox: Keeps archives and a JSON manifest in `outbox_dir`.
+
+    Manifest entry per archive:
+        {"name", "upload_name", "priority", "size", "attempts", "deferrals", "enqueued",
+         "next_attempt", "last_error"}
+    "name" is the file inside the outbox; "upload_name" is the filename sent to the server.
+    """
+
+    def __init__(self, outbox_dir="outbox", retry_base=1800, retry_max=86400, ledger=None):
+        """
+        :param outbox_dir: Directory holding queued archives and manifest.json.
+        :param retry_base: Delay (seconds) after the first failure.
+        :param retry_max: Upper bound for the retry delay (seconds).
+        :param ledger: Optional UploadLedger told when archives are queued and confirmed.
+        """
+        self.ledger = ledger
+        self.outbox_dir = Path(outbox_dir)
+        self.outbox_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.outbox_dir / "manifest.json"
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.items = self.load_manifest()
+
+    def load_manifest(self):
+        """
+        Load the manifest and drop entries whose archive no longer exists.
+
+        :return: Dict of archive name -> entry.
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            items = {}
+        except (ValueError, OSError) as e:
+            print(f"[OUTBOX] Manifest unreadable, rebuilding: {e}")
+            items = {}
+
+        # Archives present on disk but missing from the manifest are re-adopted
+        for path in self.outbox_dir.glob("*.zip"):
+            if path.name not in items:
+                items[path.name] = self.new_entry(path)
+
+        return {name: entry for name, entry in items.items() if (self.outbox_dir / name).exists()}
+
+    def save_manifest(self):
+        """
+        Write the manifest atomically (temp file + fsync + rename).
+        """
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.items, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def classify(self, name):
+        """
+        Upload priority for an archive: logs, then thumbnails, then full images.
+        """
+        lower = name.lower()
+        if lower.startswith("log"):
+            return PRIORITY_LOG
+        if "thumb" in lower:
+            return PRIORITY_THUMBNAIL
+        return PRIORITY_IMAGE
+
+    def new_entry(self, path, upload_name=None):
+        return {
+            "name": path.name,
+            "upload_name": upload_name or path.name,
+            "priority": self.classify(path.name),
+            "size": path.stat().st_size,
+            "attempts": 0,
+            "deferrals": 0,
+            "enqueued": time.time(),
+            "next_attempt": 0,
+            "last_error": None,
+        }
+
+    def enqueue(self, file_path):
+        """
+        Move an archive into the outbox.
+
+        LOG archives supersede a pending one (the LOG folder only grows, so the newest
+        archive contains the older one) and inherit its retry state. Other name clashes get
+        a timestamp suffix on disk; the server still receives the original filename.
+
+        :param file_path: Archive to queue.
+        :return: Name of the archive inside the outbox.
+        """
+        src = Path(file_path)
+        name = src.name
+
+        if name in self.items and self.classify(name) == PRIORITY_LOG:
+            old = self.items[name]
+            shutil.move(str(src), str(self.outbox_dir / name))
+            self.items[name] = self.new_entry(self.outbox_dir / name)
+            for key in ("attempts", "next_attempt", "last_error"):
+                self.items[name][key] = old[key]
+        else:
+            if name in self.items:
+                name = f"{src.stem}_{time.strftime('%Y%m%d_%H%M%S')}{src.suffix}"
+            shutil.move(str(src), str(self.outbox_dir / name))
+            self.items[name] = self.new_entry(self.outbox_dir / name, upload_name=src.name)
+
+        self.save_manifest()
+        if self.ledger:
+            self.ledger.archive_moved(src, self.outbox_dir / name)
+        print(f"[OUTBOX] Queued {name}")
+        return name
+
+    def pending(self):
+        """
+        :return: All queued entries, in upload order (priority, then age).
+        """
+        return sorted(self.items.values(), key=lambda e: (e["priority"], e["enqueued"]))
+
+    def due_items(self, now=None):
+        """
+        :return: Queued entries whose backoff has expired, in upload order.
+        """
+        now = time.time() if now is None else now
+        return [entry for entry in self.pending() if entry["next_attempt"] <= now]
+
+    def path_of(self, entry):
+        return self.outbox_dir / entry["name"]
+
+    def upload_name_of(self, entry):
+        # Entries written before "upload_name" existed were never renamed
+        return entry.get("upload_name") or entry["name"]
+
+    def mark_done(self, entry):
+        """
+        Delete a confirmed archive and its manifest entry.
+        """
+        path = self.path_of(entry)
+        if self.ledger:
+            self.ledger.archive_uploaded(path)
+        if path.exists():
+            path.unlink()
+        self.items.pop(entry["name"], None)
+        self.save_manifest()
+
+    def mark_failed(self, entry, error):
+        """
+        Record a failed attempt and schedule the next one with exponential backoff.
+        """
+        entry["attempts"] += 1
+        delay = min(self.retry_base * 2 ** (entry["attempts"] - 1), self.retry_max)
+        entry["next_attempt"] = time.time() + delay
+        entry["last_error"] = error
+        self.save_manifest()
+        print(f"[OUTBOX] {entry['name']} failed ({error}), retry in {int(delay)} s")
+
+    def mark_deferred(self, entry):
+        """
+        Leave an archive for a later wake without counting a failed attempt (the backoff
+        is unchanged); "deferrals" lets the scheduler force it out eventually.
+        """
+        entry["deferrals"] = entry.get("deferrals", 0) + 1
+        self.save_manifest()
+
+    def process(self, uploader, timeout=300, scheduler=None, remaining_seconds=None, wifi_details=None):
+        """
+        Upload every due archive; delete it only after a confirmed HTTP 200.
+
+        With a scheduler, only the due archives that fit into `remaining_seconds` are sent;
+        the others are deferred without counting as a failed attempt (their "deferrals"
+        count lets the scheduler force them out eventually).
+
+        :param uploader: DataUploader (uses upload_files_parallel).
+        :param timeout: Per-file HTTP timeout (seconds).
+        :param scheduler: Optional UploadScheduler.
+        :param remaining_seconds: Time left in this wake (used with scheduler).
+        :param wifi_details: Current link details (used with scheduler).
+        :return: Dict with "uploaded", "failed" and "deferred" archive names.
+        """
+        due = self.due_items()
+        result = {
+            "uploaded": [],
+            "failed": [],
+            "deferred": [e["name"] for e in self.pending() if e not in due],
+        }
+
+        if scheduler and remaining_seconds is not None:
+            due, later = scheduler.plan(due, remaining_seconds, wifi_details)
+            result["deferred"].extend(e["name"] for e in later)
+            for entry in later:
+                self.mark_deferred(entry)
+        if not due:
+            return result
+
+        statuses = uploader.upload_files_parallel([self.path_of(entry) for entry in due], timeout=timeout,
+                                                  upload_names={self.path_of(entry): self.upload_name_of(entry)
+                                                                for entry in due})
+        for entry in due:
+            status_code, text = statuses[self.path_of(entry)]
+            if status_code == 200:
+                self.mark_done(entry)
+                result["uploaded"].append(entry["name"])
+            else:
+                self.mark_failed(entry, text if status_code is None else f"Status {status_code}")
+                result["failed"].append(entry["name"])
+
+        if scheduler:
+            scheduler.record(uploader.http_stats, wifi_details)
+        return result
+
+
+# Ledger states of a source item
+STATUS_COMPRESSED = "compressed"    # Archive written next to the source
+STATUS_QUEUED = "queued"            # Archive moved into the outbox
+STATUS_UPLOADED = "uploaded"        # Server answered 200 for the archive
+
+
+class UploadLedger:
+    """
+    UploadLedger: Content-addressed record of upload progress, stored as JSON.
+
+    Entry per source item, keyed by SHA-256 of its content:
+        {"sha256", "size", "item", "status", "archive", "updated"}
+    A folder hashes to the SHA-256 over its (relative path, file digest) pairs.
+    """
+
+    def __init__(self, ledger_path="upload_state/ledger.json", retention_days=30):
+        """
+        :param ledger_path: JSON file holding the ledger.
+        :param retention_days: Uploaded entries older than this are forgotten.
+        """
+        self.ledger_path = Path(ledger_path)
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries = self.load()
+
+        cutoff = time.time() - retention_days * 86400
+        self.entries = {key: entry for key, entry in self.entries.items()
+                        if entry["status"] != STATUS_UPLOADED or entry["updated"] >= cutoff}
+
+    def load(self):
+        try:
+            with open(self.ledger_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            print(f"[LEDGER] Ledger unreadable, starting empty: {e}")
+            return {}
+
+    def save(self):
+        """
+        Write the ledger atomically (temp file + fsync + rename).
+        """
+        tmp_path = self.ledger_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.ledger_path)
+
+    def digest(self, item_path):
+        """
+        :return: (sha256 hex, size in bytes) of a file or folder.
+        """
+        if os.path.isdir(item_path):
+            folder_digest = hashlib.sha256()
+            size = 0
+            for root, dirs, files in os.walk(item_path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    file_hash, file_size = self.digest(file_path)
+                    folder_digest.update(f"{os.path.relpath(file_path, item_path)}\0{file_hash}\n".encode())
+                    size += file_size
+            return folder_digest.hexdigest(), size
+
+        file_digest = hashlib.sha256()
+        with open(item_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                file_digest.update(block)
+        return file_digest.hexdigest(), os.path.getsize(item_path)
+
+    def skip_reason(self, sha256):
+        """
+        :return: Why an item with this content needs no work ("uploaded", "queued",
+                 "compressed"), or None if it must be processed.
+        """
+        entry = self.entries.get(sha256)
+        if entry is None:
+            return None
+        if entry["status"] == STATUS_UPLOADED:
+            return STATUS_UPLOADED
+        # Queued or compressed items resume only if their archive survived
+        if entry.get("archive") and os.path.exists(entry["archive"]):
+            return entry["status"]
+        return None
+
+    def record(self, sha256, size, item, status, archive=None):
+        """
+        Create or update the entry for one source item.
+        """
+        self.entries[sha256] = {
+            "sha256": sha256,
+            "size": size,
+            "item": item,
+            "status": status,
+            "archive": os.path.abspath(archive) if archive else None,
+            "updated": time.time(),
+        }
+        self.save()
+
+    def archive_moved(self, old_path, new_path):
+        """
+        Mark items whose archive was moved into the outbox as queued.
+        """
+        self._update_archive(old_path, STATUS_QUEUED, new_path)
+
+    def archive_uploaded(self, archive_path):
+        """
+        Mark every item contained in a confirmed archive as uploaded.
+        """
+        self._update_archive(archive_path, STATUS_UPLOADED)
+
+    def _update_archive(self, archive_path, status, new_path=None):
+        archive_path = os.path.abspath(archive_path)
+        changed = False
+        for entry in self.entries.values():
+            if entry.get("archive") == archive_path:
+                entry["status"] = status
+                entry["archive"] = os.path.abspath(new_path) if new_path else archive_path
+                entry["updated"] = time.time()
+                changed = True
+        if changed:
+            self.save()
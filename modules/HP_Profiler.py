@@ -0,0 +1,232 @@
+"""
+Profiler Module: Start-up profiling, on-demand construction and wake accounting.
+StartupProfile records how long each import and constructor takes (and when the
+first useful action happened); LazySubsystem defers building a controller until
+one of its attributes is first used, so a wake only pays for what it touches.
+WakeCycle splits a wake into phases, replaces fixed sleeps with readiness
+conditions that have deadlines, and reports awake time and energy per phase.
+"""
+
+import time
+
+
+class StartupProfile:
+    """
+    StartupProfile: Timeline of imports, constructors and marks since `start`.
+
+    Entry per measurement:
+        {"kind" ("import", "init" or "mark"), "name", "at" (seconds since start), "seconds"}
+    """
+
+    def __init__(self, start=None):
+        """
+        :param start: time.monotonic() value the timeline is relative to (defaults to now).
+        """
+        self.start = time.monotonic() if start is None else start
+        self.entries = []
+
+    def measure(self, kind, name):
+        """
+        Context manager that times its block, e.g.
+
+            with profile.measure("import", "HP_Camera"):
+                from modules.HP_Camera import CameraController
+        """
+        return _Measurement(self, kind, name)
+
+    def mark(self, name):
+        """
+        Record a point in time (e.g. "first action").
+        """
+        self.entries.append({"kind": "mark", "name": name, "at": self.elapsed(), "seconds": 0.0})
+
+    def lazy(self, name, factory):
+        """
+        :return: LazySubsystem that calls `factory` on first use.
+        """
+        return LazySubsystem(name, factory)
+
+    def elapsed(self):
+        return round(time.monotonic() - self.start, 3)
+
+    def totals(self):
+        """
+        :return: {"import": seconds, "init": seconds} summed over all entries.
+        """
+        totals = {"import": 0.0, "init": 0.0}
+        for entry in self.entries:
+            if entry["kind"] in totals:
+                totals[entry["kind"]] = round(totals[entry["kind"]] + entry["seconds"], 3)
+        return totals
+
+    def report(self):
+        """
+        :return: Multi-line text report, one line per entry in time order, then the totals.
+        """
+        lines = []
+        for entry in sorted(self.entries, key=lambda entry: entry["at"]):
+            if entry["kind"] == "mark":
+                lines.append(f"{entry['at']:8.3f} s  mark    {entry['name']}")
+            else:
+                lines.append(f"{entry['at']:8.3f} s  {entry['kind']:<6}  {entry['name']} ({entry['seconds']:.3f} s)")
+        totals = self.totals()
+        lines.append(f"imports {totals['import']:.3f} s, inits {totals['init']:.3f} s, "
+                     f"elapsed {self.elapsed():.3f} s")
+        return "\n".join(lines)
+
+
+class _Measurement:
+    def __init__(self, profile, kind, name):
+        self.profile = profile
+        self.kind = kind
+        self.name = name
+        self.at = None
+
+    def __enter__(self):
+        self.at = self.profile.elapsed()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.entries.append({"kind": self.kind, "name": self.name, "at": self.at,
+                                     "seconds": round(time.monotonic() - self._start, 3)})
+        return False
+
+
+class LazySubsystem:
+    """
+    LazySubsystem: Stand-in for a controller that is built on first attribute access.
+    Attribute reads and writes are forwarded to the real object; `loaded` tells whether
+    it was built (e.g. to skip close() on subsystems this wake never used).
+    """
+
+    def __init__(self, name, factory):
+        """
+        :param name: Subsystem name (for messages).
+        :param factory: Callable returning the real object.
+        """
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        """
+        :return: The real object, building it on the first call.
+        """
+        if self._instance is None:
+            object.__setattr__(self, "_instance", self._factory())
+        return self._instance
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.get(), attr, value)
+
+    def __repr__(self):
+        return f"<LazySubsystem {self._name} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+class WakeCycle:
+    """
+    WakeCycle: Awake-time accounting for one wake of the node.
+
+    Phase entry:  {"name", "start", "end", "seconds"}        (seconds since `start`)
+    Wait entry:   {"name", "phase", "met", "seconds", "deadline"}
+    Energy is estimated as awake seconds x `power_w` (average board power).
+    """
+
+    def __init__(self, start=None, power_w=3.0):
+        """
+        :param start: time.monotonic() value of the wake start (defaults to now).
+        :param power_w: Average power draw while awake (watts).
+        """
+        self.start = time.monotonic() if start is None else start
+        self.power_w = power_w
+        self.phases = []
+        self.waits = []
+
+    def elapsed(self):
+        return round(time.monotonic() - self.start, 3)
+
+    def enter(self, name):
+        """
+        End the current phase and start `name`. The first phase starts at the wake start.
+        """
+        now = self.elapsed()
+        self.finish(now)
+        self.phases.append({"name": name, "start": self.phases[-1]["end"] if self.phases else 0.0,
+                            "end": None, "seconds": 0.0})
+
+    def finish(self, now=None):
+        """
+        End the current phase (if any).
+        """
+        if self.phases and self.phases[-1]["end"] is None:
+            phase = self.phases[-1]
+            phase["end"] = self.elapsed() if now is None else now
+            phase["seconds"] = round(phase["end"] - phase["start"], 3)
+
+    def wait_until(self, name, condition, deadline, interval=0.05, max_interval=1.0):
+        """
+        Poll `condition` with exponential backoff until it returns a true value or
+        `deadline` seconds have passed. Exceptions from the condition count as "not yet".
+
+        :return: True if the condition was met before the deadline.
+        """
+        start = time.monotonic()
+        delay = interval
+        while True:
+            try:
+                met = bool(condition())
+            except Exception as e:
+                print(f"[WAKE] {name}: {e}")
+                met = False
+            remaining = deadline - (time.monotonic() - start)
+            if met or remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_interval)
+
+        waited = round(time.monotonic() - start, 3)
+        self.waits.append({"name": name, "phase": self.phases[-1]["name"] if self.phases else None,
+                           "met": met, "seconds": waited, "deadline": deadline})
+        print(f"[WAKE] {name}: {'ready' if met else 'deadline reached'} after {waited} s")
+        return met
+
+    def summary(self):
+        """
+        :return: {"awake_seconds", "energy_j", "phases": {name: seconds},
+                  "waits": {name: {"met", "seconds"}}}
+        """
+        phases = {}
+        for phase in self.phases:
+            seconds = phase["seconds"] if phase["end"] is not None else round(self.elapsed() - phase["start"], 3)
+            phases[phase["name"]] = round(phases.get(phase["name"], 0.0) + seconds, 3)
+        awake = self.elapsed()
+        return {
+            "awake_seconds": awake,
+            "energy_j": round(awake * self.power_w, 1),
+            "phases": phases,
+            "waits": {wait["name"]: {"met": wait["met"], "seconds": wait["seconds"]} for wait in self.waits},
+        }
+
+    def report(self):
+        """
+        :return: Multi-line text report: seconds, share and energy per phase, then the waits.
+        """
+        summary = self.summary()
+        awake = summary["awake_seconds"] or 1.0
+        lines = [f"{'phase':<10} {'seconds':>8} {'share':>6} {'energy':>8}"]
+        for name, seconds in summary["phases"].items():
+            lines.append(f"{name:<10} {seconds:8.1f} {seconds / awake:6.0%} {seconds * self.power_w:7.1f}J")
+        lines.append(f"{'awake':<10} {summary['awake_seconds']:8.1f} {'':>6} {summary['energy_j']:7.1f}J "
+                     f"({self.power_w} W, {summary['energy_j'] / 3.6:.1f} mWh)")
+        for wait in self.waits:
+            lines.append(f"  wait {wait['name']} ({wait['phase']}): {'met' if wait['met'] else 'deadline'} "
+                         f"after {wait['seconds']:.2f} s of {wait['deadline']} s")
+        return "\n".join(lines)
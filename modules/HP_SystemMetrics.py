@@ -0,0 +1,178 @@
+"""
+SystemMetrics Module: In-process system metrics for telemetry.
+Reads os.statvfs, /sys/class/thermal, /proc/meminfo, /proc/loadavg and the
+firmware throttling state directly instead of forking `df` or going through
+gpiozero. Values are numeric and cached for a short TTL.
+"""
+
+import os
+import math
+import time
+import subprocess
+
+# Raspberry Pi firmware throttling flags (same bits as `vcgencmd get_throttled`)
+THROTTLE_FLAGS = {
+    0: "under_voltage",
+    1: "freq_capped",
+    2: "throttled",
+    3: "soft_temp_limit",
+    16: "under_voltage_occurred",
+    17: "freq_capped_occurred",
+    18: "throttled_occurred",
+    19: "soft_temp_limit_occurred",
+}
+
+
+class SystemMetrics:
+    """
+    SystemMetrics: Cached readers for disk, CPU temperature, memory, load and throttling.
+    Missing sources (e.g. no thermal zone off the Pi) give None instead of raising.
+    """
+
+    def __init__(self, ttl=5.0, disk_path="/", thermal_path="/sys/class/thermal/thermal_zone0/temp",
+                 proc_dir="/proc", throttled_path="/sys/devices/platform/soc/soc:firmware/get_throttled"):
+        """
+        :param ttl: Seconds a reading is reused before the source is read again.
+        :param disk_path: Mount point reported by disk().
+        :param thermal_path: Thermal zone file (millidegrees Celsius).
+        :param proc_dir: procfs mount (meminfo, loadavg).
+        :param throttled_path: Firmware throttling state (hex bit mask).
+        """
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.thermal_path = thermal_path
+        self.proc_dir = proc_dir
+        self.throttled_path = throttled_path
+        self.cache = {}
+
+    def _cached(self, name, reader):
+        now = time.monotonic()
+        entry = self.cache.get(name)
+        if entry is None or now - entry[0] > self.ttl:
+            entry = (now, reader())
+            self.cache[name] = entry
+        return entry[1]
+
+    def disk(self):
+        """
+        :return: {"disk_total_bytes", "disk_free_bytes", "disk_free_mib"} for `disk_path`
+                 (free space available to unprivileged users, like df).
+        """
+        def read():
+            st = os.statvfs(self.disk_path)
+            free = st.f_bavail * st.f_frsize
+            return {
+                "disk_total_bytes": st.f_blocks * st.f_frsize,
+                "disk_free_bytes": free,
+                "disk_free_mib": free // (1024 * 1024),
+            }
+        return self._cached("disk", read)
+
+    def cpu_temperature(self):
+        """
+        :return: CPU temperature in degrees Celsius, or None if unavailable.
+        """
+        def read():
+            text = _read_text(self.thermal_path)
+            return int(text) / 1000 if text else None
+        return self._cached("cpu_temperature", read)
+
+    def memory(self):
+        """
+        :return: {"mem_total_kib", "mem_available_kib"} from meminfo (None if unavailable).
+        """
+        def read():
+            values = {}
+            for line in (_read_text(os.path.join(self.proc_dir, "meminfo")) or "").splitlines():
+                key, _, rest = line.partition(":")
+                if key in ("MemTotal", "MemAvailable"):
+                    values[key] = int(rest.split()[0])
+            return {
+                "mem_total_kib": values.get("MemTotal"),
+                "mem_available_kib": values.get("MemAvailable"),
+            }
+        return self._cached("memory", read)
+
+    def load(self):
+        """
+        :return: {"load_1m", "load_5m", "load_15m"} from loadavg (None if unavailable).
+        """
+        def read():
+            fields = (_read_text(os.path.join(self.proc_dir, "loadavg")) or "").split()
+            if len(fields) < 3:
+                return {"load_1m": None, "load_5m": None, "load_15m": None}
+            return {"load_1m": float(fields[0]), "load_5m": float(fields[1]), "load_15m": float(fields[2])}
+        return self._cached("load", read)
+
+    def throttled(self):
+        """
+        :return: {"throttled_mask", plus one bool per THROTTLE_FLAGS name}, or
+                 {"throttled_mask": None} when the firmware does not expose it.
+        """
+        def read():
+            text = _read_text(self.throttled_path)
+            if not text:
+                return {"throttled_mask": None}
+            mask = int(text, 16)
+            flags = {name: bool(mask & (1 << bit)) for bit, name in THROTTLE_FLAGS.items()}
+            return dict(flags, throttled_mask=mask)
+        return self._cached("throttled", read)
+
+    def snapshot(self):
+        """
+        :return: All metrics in one flat dict (numeric fields, None where unavailable).
+        """
+        data = {"cpu_temp": self.cpu_temperature()}
+        data.update(self.disk())
+        data.update(self.memory())
+        data.update(self.load())
+        data.update(self.throttled())
+        return data
+
+
+def format_df_size(size):
+    """
+    Format a byte count like `df -h` (powers of 1024, rounded up, one decimal below 10),
+    e.g. 12884901888 -> "12G". Kept for the legacy text telemetry field.
+    """
+    for unit in ("", "K", "M", "G", "T", "P"):
+        if size < 1024 or unit == "P":
+            break
+        size /= 1024
+    if unit == "":
+        return str(int(size))
+    if size < 10:
+        value = math.ceil(size * 10) / 10
+        if value < 10:
+            return f"{value:.1f}{unit}"
+    return f"{math.ceil(size)}{unit}"
+
+
+def clock_synchronized(timesync_flag="/run/systemd/timesync/synchronized"):
+    """
+    Whether the system clock has been set by NTP in this boot (a Pi has no RTC of its own,
+    so until then the clock is whatever fake-hwclock restored).
+
+    :param timesync_flag: File systemd-timesyncd creates once it has synchronized.
+    :return: True/False, or None if neither timesyncd nor timedatectl can tell.
+    """
+    if os.path.exists(timesync_flag):
+        return True
+    try:
+        result = subprocess.run(["timedatectl", "show", "-p", "NTPSynchronized", "--value"],
+                                capture_output=True, text=True, timeout=2)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    value = result.stdout.strip()
+    return None if result.returncode != 0 or not value else value == "yes"
+
+
+def _read_text(path):
+    """
+    :return: Stripped file content, or None if the file cannot be read.
+    """
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
@@ -0,0 +1,273 @@
+"""
+UploadPipeline Module: asyncio orchestration of one wake's upload stage.
+Telemetry, compression and HTTP uploads run as overlapping stages: each archive
+is queued in the outbox and handed to the uploaders as soon as its compression
+job finishes, instead of waiting for the whole directory to be compressed.
+With an UploadScheduler, the archives to send and their order come from
+UploadScheduler.plan(), as in UploadOutbox.process(); the others are compressed and
+queued but deferred. At the wake deadline compression stops and no new upload starts;
+uploads in flight were given only the remaining time as their timeout, and one cut off
+by that timeout is deferred rather than counted as failed. Everything else stays in
+the outbox.
+
+The HTTP client (requests) is blocking, so uploads run in worker threads through
+asyncio.to_thread; asyncio only schedules the stages and enforces the deadline.
+"""
+
+import os
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+
+class UploadPipeline:
+    """
+    UploadPipeline: Runs telemetry, compression and uploads for a DataUploader concurrently.
+
+    The blocking DataUploader calls (UDP send, pooled requests.Session uploads) run in
+    worker threads; compression runs in a process pool. At most `max_uploads` HTTP
+    uploads are in flight at once. Per-stage timings are kept in `self.timings`.
+    """
+
+    def __init__(self, uploader, outbox, max_uploads=None, compress_workers=None, timeout=300, scheduler=None):
+        """
+        :param uploader: DataUploader.
+        :param outbox: UploadOutbox that holds archives until they are confirmed.
+        :param max_uploads: Concurrent HTTP uploads (defaults to `uploader.max_workers`).
+        :param compress_workers: Compression processes (defaults to `uploader.compress_workers`).
+        :param timeout: Per-file HTTP timeout (seconds).
+        :param scheduler: Optional UploadScheduler that learns from the measured upload rates.
+        """
+        self.uploader = uploader
+        self.outbox = outbox
+        self.max_uploads = max_uploads or uploader.max_workers
+        self.compress_workers = compress_workers or uploader.compress_workers
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.timings = {}
+        self._start = None
+        self._deadline_at = None
+
+    def run(self, upload_dir, telemetry=None, deadline=None, wifi_details=None):
+        """
+        Blocking entry point (see run_async).
+        """
+        return asyncio.run(self.run_async(upload_dir, telemetry, deadline, wifi_details))
+
+    async def run_async(self, upload_dir, telemetry=None, deadline=None, wifi_details=None):
+        """
+        Run the upload stage until everything is sent or the deadline passes.
+
+        :param upload_dir: Directory with the files and folders of this wake.
+        :param telemetry: Optional (temp, hum, lux, wifi_details) for upload_sensor_data.
+        :param deadline: Seconds the whole stage may take (None = no limit). Uploads in flight
+                         at the deadline get at most the time left when they started.
+        :param wifi_details: Current link details (used with the scheduler).
+        :return: Dict with "telemetry" (bool or None), "uploaded", "failed", "deferred", "pending",
+                 "compressed" (item -> zip path or "ERROR: ..."), "timed_out" and "timings".
+        """
+        self._start = time.monotonic()
+        self._deadline_at = None if deadline is None else self._start + deadline
+        self.timings = {}
+        result = {"telemetry": None, "uploaded": [], "failed": [], "deferred": [], "pending": [],
+                  "compressed": {}, "timed_out": False, "timings": self.timings}
+        per_file = []
+        queue = asyncio.Queue()
+        executor = ProcessPoolExecutor(max_workers=self.compress_workers)
+
+        producer = asyncio.create_task(self._compress(upload_dir, queue, executor, result, wifi_details))
+        tasks = [producer]
+        tasks += [asyncio.create_task(self._upload_worker(queue, per_file, result))
+                  for _ in range(self.max_uploads)]
+        if telemetry is not None:
+            tasks.append(asyncio.create_task(self._telemetry(telemetry, result)))
+
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=deadline)
+            if pending:
+                result["timed_out"] = True
+                print(f"[PIPELINE] Wake deadline of {deadline} s reached, leaving the rest in the outbox")
+                # Stop compressing (this also releases idle upload workers). Uploads in flight
+                # are bounded by their own timeout and still record their outcome in the outbox.
+                producer.cancel()
+                await asyncio.wait(pending)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for task in tasks:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+        self.timings["total"] = {"start": 0.0, "end": self._elapsed(), "seconds": self._elapsed()}
+        self.uploader.http_stats = self.uploader.summarize_uploads(per_file, self._elapsed())
+        if self.scheduler:
+            self.scheduler.record(self.uploader.http_stats, wifi_details)
+        result["pending"] = [entry["name"] for entry in self.outbox.pending()]
+        print(f"[PIPELINE] Stage timings: {self.timings}")
+        return result
+
+    async def _telemetry(self, telemetry, result):
+        with self._stage("telemetry"):
+            result["telemetry"] = await asyncio.to_thread(self.uploader.upload_sensor_data, *telemetry)
+
+    async def _compress(self, upload_dir, queue, executor, result, wifi_details=None):
+        """
+        Producer: plan this wake's uploads, feed the planned archives left by earlier wakes,
+        then each new archive as soon as its compression job completes.
+        """
+        planned = self.scheduler is not None and self._deadline_at is not None
+        try:
+            if not planned:
+                # Nothing to plan: earlier archives go out while this wake's are hashed
+                for entry in self.outbox.due_items():
+                    queue.put_nowait(entry)
+
+            jobs, digests = [], {}
+            with self._stage("compression"):
+                if os.path.isdir(upload_dir):
+                    skipped, jobs, digests = await asyncio.to_thread(self.uploader._plan_compression, upload_dir)
+                    result["compressed"].update(skipped)
+
+                    # Archives compressed by an interrupted wake but never queued
+                    for item, reason in skipped.items():
+                        if reason == "SKIPPED: compressed":
+                            archive = self.uploader.ledger.entries[digests[item][0]]["archive"]
+                            name = self.outbox.enqueue(archive)
+                            result["compressed"][item] = archive
+                            if not planned:
+                                queue.put_nowait(self.outbox.items[name])
+                else:
+                    print("The specified directory does not exist!")
+
+            send = set(jobs)
+            if planned:
+                backlog, jobs, send = self._plan(jobs, digests, wifi_details, result)
+                for entry in backlog:
+                    queue.put_nowait(entry)
+            if not jobs:
+                return
+
+            with self._stage("compression"):
+                loop = asyncio.get_running_loop()
+
+                async def run_job(job):
+                    item, item_path, zip_filename = job
+                    try:
+                        decisions = await loop.run_in_executor(executor, self.uploader.compress_item, item_path,
+                                                               zip_filename, self.uploader.compression_policy)
+                        return job, decisions, None
+                    except Exception as e:
+                        return job, None, e
+
+                for finished in asyncio.as_completed([run_job(job) for job in jobs]):
+                    job, decisions, error = await finished
+                    item, item_path, zip_filename = job
+                    zip_path = self.uploader._finish_compression(item, item_path, zip_filename,
+                                                                 digests.get(item), decisions, error)
+                    result["compressed"][item] = zip_path
+                    if zip_path.startswith("ERROR:"):
+                        continue
+                    entry = self.outbox.items[self.outbox.enqueue(zip_path)]
+                    if job in send:
+                        queue.put_nowait(entry)
+                    else:
+                        self.outbox.mark_deferred(entry)
+                        result["deferred"].append(entry["name"])
+        finally:
+            for _ in range(self.max_uploads):
+                queue.put_nowait(None)
+
+    def _plan(self, jobs, digests, wifi_details, result):
+        """
+        Let the scheduler choose what fits into the time left: the due outbox entries plus
+        one candidate per compression job, sized by its source (an upper bound for the archive).
+
+        :return: (backlog entries to upload, jobs with the planned ones first, planned jobs)
+        """
+        now = time.time()
+        candidates = self.outbox.due_items()
+        for job in jobs:
+            item, item_path, zip_filename = job
+            name = os.path.basename(zip_filename)
+            size = digests[item][1] if item in digests else _source_size(item_path)
+            candidates.append({"name": name, "priority": self.outbox.classify(name), "size": size,
+                               "enqueued": now, "job": job})
+        candidates.sort(key=lambda entry: (entry["priority"], entry["enqueued"]))
+
+        selected, later = self.scheduler.plan(candidates, self._deadline_at - time.monotonic(), wifi_details)
+        for entry in later:
+            if "job" not in entry:
+                self.outbox.mark_deferred(entry)
+                result["deferred"].append(entry["name"])
+        # Planned jobs are compressed first, in upload order; deferred ones are still
+        # compressed and queued so their sources can be cleaned
+        send = [entry["job"] for entry in selected if "job" in entry]
+        return ([entry for entry in selected if "job" not in entry],
+                send + [entry["job"] for entry in later if "job" in entry], set(send))
+
+    async def _upload_worker(self, queue, per_file, result):
+        """
+        Consumer: upload archives from the queue until the producer is finished.
+        """
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            timeout = self.timeout
+            if self._deadline_at is not None:
+                remaining = self._deadline_at - time.monotonic()
+                if remaining <= 0:
+                    return  # Past the deadline: the entry stays in the outbox
+                timeout = min(timeout, remaining)
+            with self._stage("upload"):
+                status_code, text = await asyncio.to_thread(
+                    self.uploader.timed_upload, self.outbox.path_of(entry), per_file, timeout,
+                    upload_name=self.outbox.upload_name_of(entry))
+            if status_code == 200:
+                self.outbox.mark_done(entry)
+                result["uploaded"].append(entry["name"])
+            elif status_code is None and timeout < self.timeout and time.monotonic() >= self._deadline_at:
+                # Cut off by our own wake deadline, not a failure of the upload
+                self.outbox.mark_deferred(entry)
+                result["deferred"].append(entry["name"])
+            else:
+                self.outbox.mark_failed(entry, text if status_code is None else f"Status {status_code}")
+                result["failed"].append(entry["name"])
+
+    def _elapsed(self):
+        return round(time.monotonic() - self._start, 3)
+
+    def _stage(self, name):
+        return _StageTimer(self, name)
+
+
+class _StageTimer:
+    """
+    Extends the [start, end] window of a stage (several workers may share one stage).
+    """
+
+    def __init__(self, pipeline, name):
+        self.pipeline = pipeline
+        self.name = name
+
+    def __enter__(self):
+        timing = self.pipeline.timings.setdefault(self.name, {"start": self.pipeline._elapsed(), "end": None,
+                                                              "seconds": 0.0})
+        timing["start"] = min(timing["start"], self.pipeline._elapsed())
+        return timing
+
+    def __exit__(self, exc_type, exc, tb):
+        timing = self.pipeline.timings[self.name]
+        timing["end"] = self.pipeline._elapsed()
+        timing["seconds"] = round(timing["end"] - timing["start"], 3)
+        return False
+
+
+def _source_size(item_path):
+    """
+    :return: Size in bytes of a file, or of all files below a folder.
+    """
+    if not os.path.isdir(item_path):
+        return os.path.getsize(item_path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(item_path) for name in files)
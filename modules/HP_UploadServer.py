@@ -1,107 +1,937 @@
+import io
 import os
+import json
+import gzip
+import uuid
+import zlib
 import time
 import socket
+import hashlib
+import threading
 import shutil
+import random
+import select
+import struct
 import zipfile
 import requests
 import datetime
 from pathlib import Path
-from gpiozero import CPUTemperature
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from requests.adapters import HTTPAdapter
+
+try:
+    from HP_SystemMetrics import SystemMetrics, format_df_size
+except ImportError:  # imported as modules.HP_UploadServer (main.py)
+    from modules.HP_SystemMetrics import SystemMetrics, format_df_size
+
+# Telemetry packet formats (selected by UPLOAD.PACKET_FORMAT in config.yaml)
+PACKET_FORMAT_LEGACY = "LEGACY"     # Three PD:ENVI text datagrams (current server)
+PACKET_FORMAT_BATCH = "BATCH"       # One PD:ENVB text datagram with all readings
+PACKET_FORMAT_BINARY = "BINARY"     # One versioned binary datagram
+
+# Binary packet layout (version 1, big-endian):
+#   header: magic "PD", version, unix timestamp
+#   body:   temp*100, hum*100, lux*100, link quality, signal level (dBm),
+#           cpu temp*100, free disk (MiB)
+#   tail:   location length + UTF-8 location
+BINARY_PACKET_MAGIC = b"PD"
+BINARY_PACKET_VERSION = 1
+BINARY_HEADER = struct.Struct(">2sBI")
+BINARY_BODY = struct.Struct(">hHIBbhI")
+
+# Reliable UDP framing (UPLOAD.RELIABLE_UDP):
+#   data: "RQ" + version + sequence number + telemetry datagram
+#   ack:  "RA" + sequence number
+RELIABLE_DATA_MAGIC = b"RQ"
+RELIABLE_ACK_MAGIC = b"RA"
+RELIABLE_VERSION = 1
+RELIABLE_HEADER = struct.Struct(">2sBI")
+RELIABLE_ACK = struct.Struct(">2sI")
+
+class RtoEstimator:
+    """
+    Retransmission timeout estimator (RFC 6298): smoothed RTT plus four RTT deviations,
+    doubled on every timeout.
+    """
+
+    def __init__(self, initial_rto=1.0, min_rto=0.2, max_rto=3.0):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.rto = initial_rto
+        self.srtt = None
+        self.rttvar = None
+
+    def update(self, rtt):
+        """
+        Feed one RTT sample (seconds) from a packet that was not retransmitted.
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = _clamp(self.srtt + 4 * self.rttvar, self.min_rto, self.max_rto)
+
+    def backoff(self):
+        """Double the timeout after a retransmission."""
+        self.rto = min(self.rto * 2, self.max_rto)
+
+# Bundle archives (UPLOAD.MODE: BUNDLE) are uploaded with &bundle=1
+BUNDLE_PREFIX = "BUNDLE_"
+BUNDLE_MANIFEST = "manifest.json"
+BUNDLE_VERSION = 1
+
+# Extensions whose content is already entropy-coded
+PRECOMPRESSED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".zip", ".gz", ".xz",
+                            ".bz2", ".7z", ".mp4", ".h264", ".mjpeg"}
+
+class CompressionPolicy:
+    """
+    Chooses the zip method per entry from a cheap compressibility probe:
+    a sample of the file is deflated at level 1 and the ratio decides between
+    STORED (incompressible), DEFLATE at `deflate_level`, or LZMA (very compressible,
+    only if `allow_lzma`; the server's unzip must support method 14).
+
+    mode "DEFLATE" disables probing and compresses everything like before.
+    """
+
+    def __init__(self, mode="AUTO", deflate_level=6, allow_lzma=False,
+                 sample_size=64 * 1024, stored_threshold=0.9, lzma_threshold=0.2):
+        """
+        :param mode: "AUTO" (probe each file) or "DEFLATE" (always deflate).
+        :param deflate_level: zlib level used for DEFLATE entries.
+        :param allow_lzma: Use LZMA for highly compressible files.
+        :param sample_size: Bytes probed per file (start and middle).
+        :param stored_threshold: Sample ratio at or above which a file is STORED.
+        :param lzma_threshold: Sample ratio at or below which LZMA is used.
+        """
+        self.mode = mode.upper()
+        self.deflate_level = deflate_level
+        self.allow_lzma = allow_lzma
+        self.sample_size = sample_size
+        self.stored_threshold = stored_threshold
+        self.lzma_threshold = lzma_threshold
+        self.decisions = []
+
+    def sample_ratio(self, file_path):
+        """
+        :return: Compressed/original ratio of a level-1 deflate over the file sample.
+        """
+        size = os.path.getsize(file_path)
+        half = self.sample_size // 2
+        with open(file_path, "rb") as f:
+            sample = f.read(half)
+            if size > self.sample_size:
+                f.seek(size // 2)
+            sample += f.read(half)
+        if not sample:
+            return 1.0
+        return len(zlib.compress(sample, 1)) / len(sample)
+
+    def choose(self, file_path):
+        """
+        :return: (compress_type, compresslevel, reason, sample_ratio) for one file.
+        """
+        if self.mode == "DEFLATE":
+            return zipfile.ZIP_DEFLATED, None, "fixed", None
+
+        if os.path.splitext(file_path)[1].lower() in PRECOMPRESSED_EXTENSIONS:
+            return zipfile.ZIP_STORED, None, "extension", None
+
+        ratio = self.sample_ratio(file_path)
+        if ratio >= self.stored_threshold:
+            return zipfile.ZIP_STORED, None, "incompressible", round(ratio, 3)
+        if self.allow_lzma and ratio <= self.lzma_threshold:
+            return zipfile.ZIP_LZMA, None, "compressible", round(ratio, 3)
+        return zipfile.ZIP_DEFLATED, self.deflate_level, "compressible", round(ratio, 3)
+
+    def zip_info(self, file_path, arcname):
+        """
+        Build a ZipInfo for `file_path` with the chosen method and level.
+
+        :return: (zinfo, decision dict)
+        """
+        compress_type, level, reason, ratio = self.choose(file_path)
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        zinfo.compress_type = compress_type
+        # ZipFile.open(zinfo, "w") reads the level from this attribute (no public setter before 3.13)
+        zinfo._compresslevel = level
+        decision = {
+            "file": arcname,
+            "method": {zipfile.ZIP_STORED: "STORED", zipfile.ZIP_DEFLATED: "DEFLATE",
+                       zipfile.ZIP_LZMA: "LZMA"}[compress_type],
+            "level": level,
+            "reason": reason,
+            "sample_ratio": ratio,
+            "size": zinfo.file_size,
+        }
+        return zinfo, decision
+
+    def record(self, decision):
+        """
+        Store and print one decision (with achieved ratio and CPU seconds).
+        """
+        self.decisions.append(decision)
+        print(f"[ZIP] {decision['file']}: {decision['method']}"
+              f"{'' if decision['level'] is None else ' ' + str(decision['level'])} "
+              f"({decision['reason']}) ratio={decision.get('ratio')} cpu={decision.get('cpu_seconds')} s")
+
+    def summary(self):
+        """
+        :return: Totals over recorded decisions: entries per method, bytes in/out, CPU seconds.
+        """
+        methods = {}
+        for decision in self.decisions:
+            methods[decision["method"]] = methods.get(decision["method"], 0) + 1
+        size = sum(d["size"] for d in self.decisions)
+        compressed = sum(d.get("compressed_size", d["size"]) for d in self.decisions)
+        return {
+            "entries": len(self.decisions),
+            "methods": methods,
+            "bytes_in": size,
+            "bytes_out": compressed,
+            "ratio": round(compressed / size, 3) if size else 1.0,
+            "cpu_seconds": round(sum(d.get("cpu_seconds", 0) for d in self.decisions), 3),
+        }
+
+
+def iter_zip_entry(zipf, file_path, arcname, policy, block_size=64 * 1024):
+    """
+    Generator that adds one file to an open ZipFile using the policy's method,
+    yielding after every block so a streaming caller can drain its sink.
+
+    :return: (as StopIteration value) decision dict including achieved ratio and CPU seconds.
+    """
+    cpu_start = time.process_time()
+    zinfo, decision = policy.zip_info(file_path, arcname)
+    with open(file_path, "rb") as f, zipf.open(zinfo, "w") as dest:
+        for block in iter(lambda: f.read(block_size), b""):
+            dest.write(block)
+            yield
+    decision["compressed_size"] = zinfo.compress_size
+    decision["ratio"] = round(zinfo.compress_size / zinfo.file_size, 3) if zinfo.file_size else 1.0
+    decision["cpu_seconds"] = round(time.process_time() - cpu_start, 4)
+    return decision
+
+
+def write_zip_entry(zipf, file_path, arcname, policy, block_size=64 * 1024):
+    """
+    Add one file to an open ZipFile (see iter_zip_entry).
+
+    :return: Decision dict.
+    """
+    entry = iter_zip_entry(zipf, file_path, arcname, policy, block_size)
+    while True:
+        try:
+            next(entry)
+        except StopIteration as done:
+            return done.value
+
+
+def zip_entries(item_path):
+    """
+    List (source path, archive name) pairs for a file or a folder. Folder entries are
+    relative to the folder, like shutil.make_archive.
+    """
+    if not os.path.isdir(item_path):
+        return [(item_path, os.path.basename(item_path))]
+
+    entries = []
+    for root, dirs, files in os.walk(item_path):
+        dirs.sort()
+        for name in sorted(files):
+            src = os.path.join(root, name)
+            entries.append((src, os.path.relpath(src, item_path)))
+    return entries
+
+
+def compress_item(item_path, zip_filename, policy):
+    """
+    Compress one file or folder into `zip_filename` following `policy`.
+
+    :return: List of decision dicts, one per archive entry.
+    """
+    # Written under a temporary name so an existing .zip is always complete
+    tmp_filename = f"{zip_filename}.tmp"
+    with zipfile.ZipFile(tmp_filename, "w") as zipf:
+        decisions = [write_zip_entry(zipf, src, arcname, policy) for src, arcname in zip_entries(item_path)]
+    os.replace(tmp_filename, zip_filename)
+    return decisions
+
+
+class UploadScheduler:
+    """
+    Decides which queued archives fit into the remaining wake time.
+
+    Throughput is estimated from the measured rates of recent uploads (persisted in
+    `history_path`) and, when there is little history, from the current link
+    (get_network_details): Wi-Fi link quality or Ethernet speed. Items are taken in
+    upload order (logs, thumbnails, full images) while their estimated transfer time
+    fits; the rest stay in the outbox for a later wake.
+
+    So that an archive larger than any wake budget is not deferred forever, one archive
+    per wake is sent regardless of its cost: the first one deferred `max_deferrals`
+    times (counted in its outbox entry as "deferrals"), or the first due one if nothing
+    else fits.
+    """
+
+    def __init__(self, history_path="upload_state/throughput.json", history_size=20,
+                 request_overhead=1.0, safety_factor=0.8, max_deferrals=3):
+        """
+        :param history_path: JSON file with recent rate samples.
+        :param history_size: Number of samples kept.
+        :param request_overhead: Seconds added per archive (connection, server processing).
+        :param safety_factor: Fraction of the remaining time that may be planned.
+        :param max_deferrals: Wakes an archive may be deferred before it is sent anyway.
+        """
+        self.history_path = Path(history_path)
+        self.history_size = history_size
+        self.request_overhead = request_overhead
+        self.safety_factor = safety_factor
+        self.max_deferrals = max_deferrals
+        self.history = _read_json_list(self.history_path)
+
+    def link_estimate(self, wifi_details):
+        """
+        Prior throughput (bytes/s) from the link alone.
+        Wi-Fi: roughly 2.5 Mbit/s at 100% link quality, falling off steeply below 40%.
+        Ethernet: half the negotiated speed.
+        """
+        wifi_details = wifi_details or {}
+        if wifi_details.get("Speed"):
+            return wifi_details["Speed"] * 1e6 / 8 * 0.5
+        quality = wifi_details.get("Link Quality")
+        if quality is None:
+            return 64 * 1024
+        return max(8 * 1024, 2.5e6 / 8 * (quality / 100) ** 2)
+
+    def estimate_throughput(self, wifi_details=None):
+        """
+        :return: Estimated upload throughput in bytes/s.
+        """
+        prior = self.link_estimate(wifi_details)
+        if not self.history:
+            return prior
+        # Exponentially weighted average of recent samples (newest counts most)
+        measured = None
+        for sample in self.history:
+            rate = sample["rate"]
+            measured = rate if measured is None else 0.7 * measured + 0.3 * rate
+        weight = min(1.0, len(self.history) / 5)
+        return weight * measured + (1 - weight) * prior
+
+    def plan(self, entries, remaining_seconds, wifi_details=None):
+        """
+        Split outbox entries (in upload order) into those to send now and those to defer.
+
+        :param entries: Outbox entries with "size" (and optionally "deferrals").
+        :param remaining_seconds: Time left in this wake for uploads.
+        :return: (selected entries, deferred entries), both in upload order
+        """
+        rate = self.estimate_throughput(wifi_details)
+        budget = max(0.0, remaining_seconds * self.safety_factor)
+        costs = [entry["size"] / rate + self.request_overhead for entry in entries]
+
+        # Starvation guard: one archive per wake goes out whatever it costs
+        forced = next((index for index, entry in enumerate(entries)
+                       if entry.get("deferrals", 0) >= self.max_deferrals), None)
+        if forced is None and entries and not any(cost <= budget for cost in costs):
+            forced = 0
+
+        # The forced archive overruns the budget anyway; the others are planned as usual
+        selected, deferred = [], []
+        planned = 0.0
+        for index, (entry, cost) in enumerate(zip(entries, costs)):
+            if index == forced:
+                selected.append(entry)
+            elif planned + cost <= budget:
+                selected.append(entry)
+                planned += cost
+            else:
+                deferred.append(entry)
+        print(f"[SCHED] {rate / 1024:.0f} KiB/s estimated, {planned:.0f}/{budget:.0f} s planned, "
+              f"{len(selected)} now, {len(deferred)} deferred"
+              f"{'' if forced is None else ', forced ' + entries[forced]['name']}")
+        return selected, deferred
+
+    def record(self, http_stats, wifi_details=None):
+        """
+        Add the measured per-file rates of the last upload batch to the history.
+        """
+        quality = (wifi_details or {}).get("Link Quality")
+        for item in http_stats.get("per_file", []):
+            if item["status"] == 200 and item["bytes"] > 0 and item["seconds"] > 0:
+                self.history.append({"rate": item["bytes"] / item["seconds"],
+                                     "link_quality": quality, "time": time.time()})
+        self.history = self.history[-self.history_size:]
+        _write_json_atomic(self.history_path, self.history)
+
+
+class _ZipStreamSink(io.RawIOBase):
+    """
+    Write-only, unseekable file object that zipfile writes into. Written bytes are
+    buffered until the streaming generator collects them with pop().
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class _SizedBody:
+    """
+    Iterable request body with a known length: requests sends it with Content-Length
+    instead of chunked transfer encoding.
+    """
+
+    def __init__(self, chunks, length):
+        self.chunks = chunks
+        self.length = length
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def __len__(self):
+        return self.length
 
 class DataUploader:
+    # Compression job run in worker processes (exposed for orchestration layers)
+    compress_item = staticmethod(compress_item)
+
     def __init__(self, 
                  version_name="PDS_V1",
                  location="Hipoint_GH",
-                 SensorReader=None):
+                 SensorReader=None,
+                 packet_format=PACKET_FORMAT_LEGACY,
+                 reliable=False,
+                 ack_deadline=5.0,
+                 max_workers=2,
+                 chunk_size=0,
+                 state_dir="upload_state",
+                 compression_policy=None,
+                 compress_workers=None,
+                 ledger=None,
+                 log_shipping="ARCHIVE",
+                 server_ip="59.125.195.194",
+                 server_udp_port=8000,
+                 server_http_port=80,
+                 slot_window=0,
+                 slot_jitter=0,
+                 metrics=None):
         """
         Initialize SensorUploader.
 
         :param version_name: Version identifier.
         :param location: Device location.
+        :param packet_format: Telemetry format: "LEGACY", "BATCH" or "BINARY".
+        :param reliable: Send telemetry with sequence numbers and wait for server ACKs.
+        :param ack_deadline: Seconds allowed for all telemetry ACKs in reliable mode.
+        :param max_workers: Number of archives uploaded concurrently.
+        :param chunk_size: Bytes per chunk for resumable uploads (0 sends each archive in one POST).
+        :param state_dir: Directory for upload state kept across wakes (e.g. resume offsets).
+        :param compression_policy: CompressionPolicy choosing the zip method per file.
+        :param compress_workers: Processes used to compress items (None = one per CPU core).
+        :param ledger: Optional UploadLedger; items it knows as done are not compressed or sent again.
+        :param log_shipping: "ARCHIVE" zips the LOG folder like any item; "INCREMENTAL" leaves it
+                             out of archives and ships only new log bytes (ship_log_increments).
+        :param server_ip: Ingest server address (e.g. a local HP_IngestServer for testing).
+        :param server_udp_port: UDP port for telemetry.
+        :param server_http_port: HTTP port for RX_IMG.php and the other endpoints.
+        :param slot_window: Seconds over which nodes spread their uploads (0 = upload at once).
+        :param slot_jitter: Extra random delay (seconds) added to the node's slot each wake.
+        :param metrics: SystemMetrics for CPU temperature and disk space (created if None).
         """
         self.version_name = version_name
         self.location = location
+        self.packet_format = packet_format.upper()
+
+        # Reliable UDP state (sequence numbers start at a random point per run)
+        self.reliable = reliable
+        self.ack_deadline = ack_deadline
+        self.next_seq = random.getrandbits(32)
+        self.rto_estimator = RtoEstimator()
+        self.udp_stats = {}
 
         # Server and upload settings
-        self.server_ip = "59.125.195.194"
-        self.base_url = "http://59.125.195.194:80"
-        self.server_udp_port = 8000
+        self.server_ip = server_ip
+        self.base_url = f"http://{server_ip}:{server_http_port}"
+        self.server_udp_port = server_udp_port
 
-        # CPU temperature and sensor reader
-        self.cpu_manager = CPUTemperature()
+        # System metrics (CPU temperature, disk space) and sensor reader
+        self.metrics = metrics or SystemMetrics()
         self.sensor_reader = SensorReader()
 
         # Reusable UDP socket
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
+        # Pooled HTTP session (keep-alive connections shared by upload workers)
+        self.max_workers = max(1, max_workers)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": f"{self.version_name}/{self.location}"})
+        self.http_stats = {}
+
+        # Resumable (chunked) upload state
+        self.chunk_size = chunk_size
+        self.state_dir = Path(state_dir)
+        self.resume_state_path = self.state_dir / "resume.json"
+        self.state_lock = threading.Lock()
+
+        # Bytes sent per streamed item (no archive on disk to measure)
+        self.stream_bytes = {}
+
+        # Per-file choice of STORED / DEFLATE / LZMA
+        self.compression_policy = compression_policy or CompressionPolicy()
+        self.compress_workers = compress_workers or os.cpu_count() or 1
+
+        # Last telemetry sent, embedded in bundle manifests
+        self.sensor_snapshot = {}
+
+        # Content-hash record of compressed / queued / uploaded items
+        self.ledger = ledger
+
+        # Incremental log shipping (offsets acknowledged by the server, per log file)
+        self.log_shipping = log_shipping.upper()
+        self.log_offsets_path = self.state_dir / "log_offsets.json"
+
+        # Upload slot (spreads nodes that wake at the same EXECUTION_HOURS)
+        self.slot_window = slot_window
+        self.slot_jitter = slot_jitter
+
     def get_disk_space(self):
         """
         Retrieve available disk space from the '/' mount point.
 
-        :return: Available disk space as a string.
+        :return: Available disk space as a string, formatted like `df -h` (e.g. "12G").
         """
-        df = os.popen("df -h /")
-        lines = df.readlines()
-        return lines[1].split()[3] if len(lines) > 1 else "N/A"
+        return format_df_size(self.metrics.disk()["disk_free_bytes"])
 
-    def upload_sensor_data(self,temp,hum,lux,wifi_details):
+    def get_disk_space_mib(self):
         """
-        Upload sensor data (temperature, humidity, and light intensity) to the server via UDP.
-        Wi-Fi and network details are optionally retrieved from the WifiInfo instance.
+        Retrieve available disk space on '/' as a number (used by the binary format).
+
+        :return: Available disk space in MiB.
+        """
+        return self.metrics.disk()["disk_free_mib"]
+
+    def get_cpu_temperature(self):
+        """
+        :return: CPU temperature in degrees Celsius (0.0 if no thermal zone is available).
         """
+        temperature = self.metrics.cpu_temperature()
+        return round(temperature, 2) if temperature is not None else 0.0
+
+    def build_sensor_packets(self, temp, hum, lux, wifi_details):
+        """
+        Build the telemetry datagrams for the configured packet format.
+
+        - LEGACY: one PD:ENVI line per measurement (T, H, L).
+        - BATCH:  one PD:ENVB line, measurements joined as "T=..;H=..;L=..".
+        - BINARY: one packet laid out as BINARY_HEADER + BINARY_BODY + location.
+
+        :return: List of encoded datagrams (bytes).
+        """
+        wifi_details = wifi_details or {}
         link_quality = wifi_details.get("Link Quality", 0)
         signal_level = wifi_details.get("Signal Level", 0)
 
-        cpu_temp = round(self.cpu_manager.temperature, 2)
+        cpu_temp = self.get_cpu_temperature()
+        now = datetime.datetime.now()
+        timestamp = now.strftime("%Y-%m-%d %H-%M-%S")
+
+        if self.packet_format == PACKET_FORMAT_BINARY:
+            location = f"{self.location}_GH".encode()[:255]
+            packet = BINARY_HEADER.pack(BINARY_PACKET_MAGIC, BINARY_PACKET_VERSION, int(now.timestamp()))
+            packet += BINARY_BODY.pack(
+                _clamp(round(temp * 100), -32768, 32767),
+                _clamp(round(hum * 100), 0, 65535),
+                _clamp(round(lux * 100), 0, 0xFFFFFFFF),
+                _clamp(int(link_quality), 0, 255),
+                _clamp(int(signal_level), -128, 127),
+                _clamp(round(cpu_temp * 100), -32768, 32767),
+                _clamp(self.get_disk_space_mib(), 0, 0xFFFFFFFF),
+            )
+            packet += bytes([len(location)]) + location
+            return [packet]
+
         disk_space = self.get_disk_space()
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H-%M-%S")
+        tail = f"{self.location}_GH:0:{link_quality}:{signal_level}:{cpu_temp}:{disk_space}:"
 
-        packets = [
-            f"PD:ENVI:{timestamp}:1:T:{temp}:{self.location}_GH:0:{link_quality}:{signal_level}:{cpu_temp}:{disk_space}:",
-            f"PD:ENVI:{timestamp}:1:H:{hum}:{self.location}_GH:0:{link_quality}:{signal_level}:{cpu_temp}:{disk_space}:",
-            f"PD:ENVI:{timestamp}:1:L:{lux}:{self.location}_GH:0:{link_quality}:{signal_level}:{cpu_temp}:{disk_space}:",
+        if self.packet_format == PACKET_FORMAT_BATCH:
+            return [f"PD:ENVB:{timestamp}:1:T={temp};H={hum};L={lux}:{tail}".encode()]
+
+        return [
+            f"PD:ENVI:{timestamp}:1:T:{temp}:{tail}".encode(),
+            f"PD:ENVI:{timestamp}:1:H:{hum}:{tail}".encode(),
+            f"PD:ENVI:{timestamp}:1:L:{lux}:{tail}".encode(),
         ]
 
+    def upload_slot_delay(self):
+        """
+        Delay before this node's upload slot: a fixed offset inside `slot_window` derived
+        from the location (so the fleet spreads evenly and each node keeps its slot),
+        plus up to `slot_jitter` seconds of random jitter.
+
+        :return: Delay in seconds (0 when slots are disabled).
+        """
+        if self.slot_window <= 0:
+            return 0.0
+        digest = hashlib.sha256(self.location.encode()).digest()
+        offset = int.from_bytes(digest[:4], "big") / 2 ** 32 * self.slot_window
+        return min(self.slot_window, offset + random.uniform(0, self.slot_jitter))
+
+    def wait_for_upload_slot(self):
+        """
+        Sleep until this node's upload slot.
+
+        :return: Seconds waited.
+        """
+        delay = self.upload_slot_delay()
+        if delay > 0:
+            print(f"[SLOT] Waiting {delay:.1f} s for upload slot")
+            time.sleep(delay)
+        return delay
+
+    def upload_sensor_data(self,temp,hum,lux,wifi_details):
+        """
+        Upload sensor data (temperature, humidity, and light intensity) to the server via UDP.
+        Wi-Fi and network details are optionally retrieved from the WifiInfo instance.
+        The datagram layout follows `self.packet_format` (see build_sensor_packets).
+
+        :return: True if every packet was sent (or, in reliable mode, acknowledged).
+        """
+        packets = self.build_sensor_packets(temp, hum, lux, wifi_details)
+        self.sensor_snapshot = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "temperature": temp,
+            "humidity": hum,
+            "lux": lux,
+            "network": dict(wifi_details or {}),
+            "cpu_temp": self.get_cpu_temperature(),
+            "disk_free_mib": self.get_disk_space_mib(),
+            "system": self.metrics.snapshot(),
+        }
+
+        if self.reliable:
+            return self.send_reliable(packets)
+
         try:
             for packet in packets:
-                self.sock.sendto(packet.encode(), (self.server_ip, self.server_udp_port))
-                time.sleep(0.2)
-            print("[UDP] Successfully sent sensor data:")
+                self.sock.sendto(packet, (self.server_ip, self.server_udp_port))
+                # The legacy server expects a short gap between PD:ENVI lines
+                if self.packet_format == PACKET_FORMAT_LEGACY:
+                    time.sleep(0.2)
+            print(f"[UDP] Sent sensor data without acknowledgement ({self.packet_format}):")
             for packet in packets:
-                print(f"Sent: {packet}")
+                print(f"Sent: {packet if self.packet_format == PACKET_FORMAT_BINARY else packet.decode()}")
+            return True
         except Exception as e:
             print(f"[UDP] Error sending sensor data: {e}")
+            return False
+
+    def send_reliable(self, packets):
+        """
+        Send datagrams with sequence numbers and retransmit until each one is
+        acknowledged or `self.ack_deadline` expires.
+
+        The retransmission timeout adapts to measured RTT (RtoEstimator); RTT is only
+        sampled from packets that were sent once (Karn's rule). Duplicate or stale ACKs
+        are ignored. Results are stored in `self.udp_stats`.
+
+        :param packets: List of telemetry datagrams (bytes).
+        :return: True if every packet was acknowledged.
+        """
+        address = (self.server_ip, self.server_udp_port)
+        pending = {}   # seq -> [frame, first_sent, last_sent, transmissions]
+        stats = {"packets": len(packets), "acked": 0, "transmissions": 0,
+                 "retransmits": 0, "duplicate_acks": 0, "rtt_ms": []}
+
+        # Drop ACKs left over from an earlier send
+        self._drain_socket()
+
+        start = time.monotonic()
+        deadline = start + self.ack_deadline
+        try:
+            for packet in packets:
+                seq = self.next_seq
+                self.next_seq = (self.next_seq + 1) % 2**32
+                frame = RELIABLE_HEADER.pack(RELIABLE_DATA_MAGIC, RELIABLE_VERSION, seq) + packet
+                now = time.monotonic()
+                self.sock.sendto(frame, address)
+                pending[seq] = [frame, now, now, 1]
+                stats["transmissions"] += 1
+
+            while pending and time.monotonic() < deadline:
+                now = time.monotonic()
+                # Retransmit everything whose timer expired, then back off once
+                expired = [seq for seq, entry in pending.items() if now - entry[2] >= self.rto_estimator.rto]
+                for seq in expired:
+                    entry = pending[seq]
+                    self.sock.sendto(entry[0], address)
+                    entry[2] = now
+                    entry[3] += 1
+                    stats["transmissions"] += 1
+                    stats["retransmits"] += 1
+                if expired:
+                    self.rto_estimator.backoff()
+
+                next_timer = min(entry[2] for entry in pending.values()) + self.rto_estimator.rto
+                wait = max(0.0, min(next_timer, deadline) - time.monotonic())
+                readable, _, _ = select.select([self.sock], [], [], wait)
+                if not readable:
+                    continue
+
+                data, _ = self.sock.recvfrom(2048)
+                if len(data) != RELIABLE_ACK.size or not data.startswith(RELIABLE_ACK_MAGIC):
+                    continue
+                _, seq = RELIABLE_ACK.unpack(data)
+                entry = pending.pop(seq, None)
+                if entry is None:
+                    stats["duplicate_acks"] += 1
+                    continue
+
+                stats["acked"] += 1
+                if entry[3] == 1:
+                    rtt = time.monotonic() - entry[1]
+                    self.rto_estimator.update(rtt)
+                    stats["rtt_ms"].append(round(rtt * 1000, 1))
+
+        except Exception as e:
+            print(f"[UDP] Error sending sensor data: {e}")
+
+        stats["delivery_ratio"] = round(stats["acked"] / stats["packets"], 3) if packets else 1.0
+        stats["elapsed_ms"] = round((time.monotonic() - start) * 1000, 1)
+        stats["rto_ms"] = round(self.rto_estimator.rto * 1000, 1)
+        self.udp_stats = stats
+
+        if pending:
+            print(f"[UDP] {len(pending)}/{len(packets)} sensor packets not acknowledged: {stats}")
+            return False
+        print(f"[UDP] Sensor data acknowledged by server: {stats}")
+        return True
 
-    def compress_each_file_in_directory(self, upload_dir):
+    def _drain_socket(self):
+        """
+        Discard any datagrams already queued on the UDP socket.
+        """
+        while True:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if not readable:
+                return
+            try:
+                self.sock.recvfrom(2048)
+            except OSError:
+                return
+
+    def compress_each_file_in_directory(self, upload_dir, workers=None):
         """
         Read all files and folders inside `upload_dir` and compress each into a separate .zip file.
         Removes the file extension from the zip file name.
+
+        Items are compressed in parallel by a process pool (one item per task). A failing
+        item is reported and skipped without affecting the others. If two items share a
+        name without extension (e.g. "a.jpg" and "a.csv"), the first in sorted order keeps
+        "a.zip" and the others get the extension appended ("a_csv.zip").
+
         :param upload_dir: The directory containing files and folders to compress.
+        :param workers: Number of processes (defaults to `self.compress_workers`).
+        :return: Dict of item name -> zip path, "SKIPPED: ..." for items the ledger already
+                 covers, or "ERROR: ..." for items that failed.
         """
         # Ensure the directory exists
         if not os.path.exists(upload_dir):
             print("The specified directory does not exist!")
-            return
+            return {}
+
+        workers = workers or self.compress_workers
+        results, jobs, digests = self._plan_compression(upload_dir)
+
+        if workers <= 1 or len(jobs) <= 1:
+            for item, item_path, zip_filename in jobs:
+                try:
+                    decisions = compress_item(item_path, zip_filename, self.compression_policy)
+                    results[item] = self._finish_compression(item, item_path, zip_filename, digests.get(item), decisions)
+                except Exception as e:
+                    results[item] = self._finish_compression(item, item_path, zip_filename, error=e)
+            return results
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = [(job, executor.submit(compress_item, job[1], job[2], self.compression_policy))
+                       for job in jobs]
+            for (item, item_path, zip_filename), future in futures:
+                try:
+                    results[item] = self._finish_compression(item, item_path, zip_filename,
+                                                             digests.get(item), future.result())
+                except Exception as e:
+                    results[item] = self._finish_compression(item, item_path, zip_filename, error=e)
+        return results
+
+    def _plan_compression(self, upload_dir):
+        """
+        :return: (results for items the ledger already covers, jobs still to compress,
+                 dict of item -> (sha256, size) when a ledger is used)
+        """
+        results = {}
+        digests = {}
+        jobs = []
+        for item, item_path, zip_filename in self._compress_jobs(upload_dir):
+            if self.ledger:
+                digests[item] = self.ledger.digest(item_path)
+                reason = self.ledger.skip_reason(digests[item][0])
+                if reason:
+                    print(f"Skipping {item_path}: already {reason}")
+                    results[item] = f"SKIPPED: {reason}"
+                    continue
+            jobs.append((item, item_path, zip_filename))
+        return results, jobs, digests
 
-        # Get all files and folders inside `upload_dir`
-        items = os.listdir(upload_dir)
+    def _finish_compression(self, item, item_path, zip_filename, digest=None, decisions=None, error=None):
+        """
+        Record the outcome of one compression job (policy statistics and ledger).
+
+        :return: Zip path, or "ERROR: ..." if the job failed.
+        """
+        if error is not None:
+            print(f"Failed to compress {item_path}: {error}")
+            for path in (zip_filename, f"{zip_filename}.tmp"):
+                if os.path.exists(path):
+                    os.remove(path)
+            return f"ERROR: {error}"
+        for decision in decisions:
+            self.compression_policy.record(decision)
+        if self.ledger and digest:
+            sha256, size = digest
+            self.ledger.record(sha256, size, item, "compressed", archive=zip_filename)
+        print(f"Compressed {'folder' if os.path.isdir(item_path) else 'file'}: {item_path} -> {zip_filename}")
+        return zip_filename
 
-        for item in items:
+    def _skip_item(self, item):
+        """
+        Items never packed into archives: existing archives, and the LOG folder when it
+        is shipped incrementally.
+        """
+        return item.endswith(".zip") or (self.log_shipping == "INCREMENTAL" and item == "LOG")
+
+    def _compress_jobs(self, upload_dir):
+        """
+        :return: Sorted list of (item, item path, zip path) with collision-free zip names.
+        """
+        jobs = []
+        used = set()
+        for item in sorted(os.listdir(upload_dir)):
             item_path = os.path.join(upload_dir, item)  # Get the full path of the item
-            item_name_without_ext = os.path.splitext(item)[0]  # Remove file extension
-            
-            zip_filename = os.path.join(upload_dir, f"{item_name_without_ext}.zip")  # Name for the .zip file
+            if not (os.path.isdir(item_path) or os.path.isfile(item_path)) or self._skip_item(item):
+                continue
+
+            item_name_without_ext, ext = os.path.splitext(item)  # Remove file extension
+            zip_name = f"{item_name_without_ext}.zip"
+            if zip_name in used:
+                zip_name = f"{item_name_without_ext}_{ext.lstrip('.')}.zip"
+            used.add(zip_name)
+
+            jobs.append((item, item_path, os.path.join(upload_dir, zip_name)))  # Name for the .zip file
+        return jobs
+
+    def build_bundle(self, upload_dir, metadata=None):
+        """
+        Pack every new file in `upload_dir` (including the LOG folder) into one archive
+        for this wake, with a JSON manifest as the first entry:
+
+            {"format": "PDS_BUNDLE", "version", "location", "node", "pds_version", "created",
+             "sensor": <last telemetry snapshot>, "metadata": <caller metadata, e.g. camera settings>,
+             "files": [{"path", "kind", "size", "sha256", "mtime", "capture"}]}
+
+        Entries are compressed with the compression policy. The server can check every
+        file against the manifest and ingest the wake as a unit.
+
+        :param upload_dir: Directory with the files of this wake.
+        :param metadata: Extra JSON-serialisable data for the manifest.
+        :return: Path of the bundle archive, or None if there was nothing to bundle.
+        """
+        if not os.path.exists(upload_dir):
+            print("The specified directory does not exist!")
+            return None
+
+        candidates = []
+        for item in sorted(os.listdir(upload_dir)):
+            item_path = os.path.join(upload_dir, item)
+            if self._skip_item(item):
+                continue
+            if os.path.isdir(item_path):
+                candidates.extend((src, f"{item}/{arcname}") for src, arcname in zip_entries(item_path))
+            elif os.path.isfile(item_path):
+                candidates.append((item_path, item))
+
+        # Files already acknowledged (or waiting in an earlier bundle) are left out
+        entries = []
+        digests = {}
+        for src, arcname in candidates:
+            digests[arcname] = _file_sha256(src)
+            reason = self.ledger.skip_reason(digests[arcname]) if self.ledger else None
+            if reason:
+                print(f"Skipping {src}: already {reason}")
+                continue
+            entries.append((src, arcname))
+        if not entries:
+            return None
+
+        created = datetime.datetime.now()
+        files = []
+        for src, arcname in entries:
+            stat = os.stat(src)
+            files.append({
+                "path": arcname,
+                "kind": _file_kind(arcname),
+                "size": stat.st_size,
+                "sha256": digests[arcname],
+                "mtime": datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+                "capture": _capture_time(arcname),
+            })
+        manifest = {
+            "format": "PDS_BUNDLE",
+            "version": BUNDLE_VERSION,
+            "location": f"{self.location}_GH",
+            "node": 1,
+            "pds_version": self.version_name,
+            "created": created.isoformat(timespec="seconds"),
+            "sensor": self.sensor_snapshot,
+            "metadata": metadata or {},
+            "files": files,
+        }
 
-            if os.path.isdir(item_path):  
-                # Compress directories
-                shutil.make_archive(zip_filename[:-4], 'zip', item_path)
-                print(f"Compressed folder: {item_path} -> {zip_filename}")
+        bundle_path = os.path.join(upload_dir, f"{BUNDLE_PREFIX}{self.location}_{created.strftime('%Y%m%d_%H%M%S')}.zip")
+        tmp_path = bundle_path + ".tmp"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+            zipf.writestr(BUNDLE_MANIFEST, json.dumps(manifest, indent=2, default=str))
+            for src, arcname in entries:
+                self.compression_policy.record(write_zip_entry(zipf, src, arcname, self.compression_policy))
+        os.replace(tmp_path, bundle_path)
 
-            elif os.path.isfile(item_path):  
-                # Compress individual files correctly
-                with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    zipf.write(item_path, arcname=item)  # Store file inside .zip with its original name
-                print(f"Compressed file: {item_path} -> {zip_filename}")
+        if self.ledger:
+            for entry in files:
+                self.ledger.record(entry["sha256"], entry["size"], entry["path"], "compressed", archive=bundle_path)
+
+        print(f"Bundled {len(files)} files -> {bundle_path}")
+        return bundle_path
 
     def upload_zip_file(self, file_path, timeout=300):
         """
@@ -111,32 +941,458 @@ class DataUploader:
         :param timeout: Timeout for the HTTP request (in seconds).
         :return: Server response text or an error message.
         """
+        status_code, text = self.upload_file_status(file_path, timeout=timeout)
+        if status_code == 200:
+            return text
+        return text if status_code is None else f"ERROR: Status {status_code}"
+
+    def upload_file_status(self, file_path, timeout=300, upload_name=None):
+        """
+        Upload a ZIP file and report the HTTP status, so callers can tell a confirmed
+        upload (200) apart from a failure.
+
+        :param file_path: Path to the ZIP file.
+        :param timeout: Timeout for the HTTP request (in seconds).
+        :param upload_name: Filename sent to the server (defaults to the file's own name).
+        :return: (status_code, text). status_code is None if no response was received,
+                 in which case text is an "ERROR: ..." message.
+        """
         url = f"{self.base_url}/ipm_web/PEST_IMAGES/RX_IMG.php?node=1&location={self.location}_GH_1"
+        upload_name = upload_name or Path(file_path).name
+        if upload_name.startswith(BUNDLE_PREFIX):
+            url += "&bundle=1"
 
         if not os.path.exists(file_path):
             print(f"File not found: {file_path}")
-            return "ERROR: File not found"
+            return None, "ERROR: File not found"
 
         try:
             with open(file_path, 'rb') as f:
-                files = {'file': f}
-                response = requests.post(url, files=files, timeout=timeout)
+                files = {'file': (upload_name, f)}
+                response = self.session.post(url, files=files, timeout=(min(10, timeout), timeout))
 
             if response.status_code == 200:
                 print(f"[HTTP] Image upload response: {response.text}")
-                return response.text
+            return response.status_code, response.text
+        except Exception as e:
+            return None, f"ERROR: {str(e)}"
+
+    def upload_file_chunked(self, file_path, timeout=300, max_retries=3, upload_name=None):
+        """
+        Upload an archive to RX_CHUNK.php in fixed-size chunks, resuming where the
+        previous attempt (possibly on an earlier wake) stopped.
+
+        Protocol (all requests carry location, upload_id, name and size):
+          GET  -> {"offset": N}  bytes the server already holds for upload_id
+          POST -> body is one chunk at `offset`, header X-Chunk-SHA256 is its digest;
+                  200 {"offset": N, "complete": bool}, 409 {"offset": N} on an offset
+                  mismatch, 422 on a checksum mismatch.
+        upload_id is the SHA-256 of the whole archive, so a re-created archive with
+        different content starts over. The acknowledged offset is saved to
+        `self.resume_state_path` after every chunk.
+
+        :param file_path: Path to the archive.
+        :param timeout: Read timeout per request (seconds).
+        :param max_retries: Consecutive failures tolerated per chunk.
+        :param upload_name: Filename sent to the server (defaults to the file's own name).
+        :return: (status_code, text) as upload_file_status; 200 once the server has the whole file.
+        """
+        if not os.path.exists(file_path):
+            print(f"File not found: {file_path}")
+            return None, "ERROR: File not found"
+
+        url = f"{self.base_url}/ipm_web/PEST_IMAGES/RX_CHUNK.php"
+        size = os.path.getsize(file_path)
+        upload_id = _file_sha256(file_path)
+        params = {"node": 1, "location": f"{self.location}_GH_1", "upload_id": upload_id,
+                  "name": upload_name or Path(file_path).name, "size": size}
+
+        offset = self._load_resume_offset(upload_id)
+        failures = 0
+        last_error = "ERROR: No response"
+
+        with open(file_path, "rb") as f:
+            while failures <= max_retries:
+                try:
+                    # The server is authoritative; the local offset only avoids a round trip on weak links
+                    if failures or offset == 0:
+                        response = self.session.get(url, params=params, timeout=(10, timeout))
+                        if response.status_code == 200:
+                            offset = min(response.json().get("offset", 0), size)
+
+                    f.seek(offset)
+                    chunk = f.read(self.chunk_size)
+                    response = self.session.post(
+                        url, params=dict(params, offset=offset), data=chunk, timeout=(10, timeout),
+                        headers={"Content-Type": "application/octet-stream",
+                                 "X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()},
+                    )
+
+                    if response.status_code == 200:
+                        reply = response.json()
+                        offset = reply.get("offset", offset + len(chunk))
+                        failures = 0
+                        if reply.get("complete"):
+                            self._save_resume_offset(upload_id, None)
+                            print(f"[HTTP] Chunked upload complete: {params['name']} ({size} bytes)")
+                            return 200, response.text
+                        self._save_resume_offset(upload_id, offset)
+                        continue
+
+                    if response.status_code == 409:
+                        server_offset = response.json().get("offset", 0)
+                        failures += 1 if server_offset == offset else 0
+                        offset = server_offset
+                        self._save_resume_offset(upload_id, offset)
+                        continue
+
+                    last_error = f"ERROR: Status {response.status_code}"
+                    failures += 1
+                except Exception as e:
+                    last_error = f"ERROR: {str(e)}"
+                    failures += 1
+
+        print(f"[HTTP] Chunked upload of {params['name']} stopped at {offset}/{size} bytes: {last_error}")
+        return None, last_error
+
+    def _load_resume_offset(self, upload_id):
+        """
+        :return: Saved resume offset for upload_id (0 if unknown).
+        """
+        with self.state_lock:
+            return self._read_resume_state().get(upload_id, {}).get("offset", 0)
+
+    def _save_resume_offset(self, upload_id, offset):
+        """
+        Persist the acknowledged offset for upload_id (None forgets it).
+        """
+        with self.state_lock:
+            state = self._read_resume_state()
+            if offset is None:
+                state.pop(upload_id, None)
             else:
-                return f"ERROR: Status {response.status_code}"
+                state[upload_id] = {"offset": offset, "updated": time.time()}
+            _write_json_atomic(self.resume_state_path, state)
+
+    def _read_resume_state(self):
+        return self._read_json(self.resume_state_path)
+
+    def ship_log_increments(self, log_dir, timeout=60, max_bytes=1024 * 1024, max_retries=3):
+        """
+        Send only the log bytes written since the last acknowledged upload.
+
+        For each *.log file the acknowledged offset is kept in `self.log_offsets_path`
+        together with the file's inode ("generation"). Only complete lines are sent, gzip
+        compressed, as the body of POST RX_LOG.php?file=..&generation=..&offset=..; the
+        server appends them and answers {"offset": N}. A new inode or a file shorter than
+        the saved offset means the log was rotated or truncated: the rest of the old
+        generation is sent from "<name>.1" if present, then the new file from 0.
+
+        :param log_dir: Folder holding messages.log / errors.log.
+        :param timeout: Read timeout per request (seconds).
+        :param max_bytes: Upper bound of raw log bytes per request.
+        :param max_retries: Consecutive offset conflicts (409) tolerated per log before giving up.
+        :return: Dict of log name -> {"sent": bytes, "offset": N} or {"error": ...}.
+        """
+        url = f"{self.base_url}/ipm_web/PEST_IMAGES/RX_LOG.php"
+        offsets = self._read_json(self.log_offsets_path)
+        results = {}
+
+        for log_path in sorted(Path(log_dir).glob("*.log")):
+            name = log_path.name
+            stat = log_path.stat()
+            state = offsets.get(name, {"generation": stat.st_ino, "offset": 0})
+            sent = 0
+
+            try:
+                if state["generation"] != stat.st_ino or stat.st_size < state["offset"]:
+                    rotated = log_path.with_name(f"{name}.1")
+                    if rotated.exists() and rotated.stat().st_ino == state["generation"]:
+                        sent += self._ship_log_tail(url, rotated, name, state, timeout, max_bytes, max_retries)
+                    print(f"[LOG] {name} rotated or truncated, starting new generation")
+                    state = {"generation": stat.st_ino, "offset": 0}
+
+                sent += self._ship_log_tail(url, log_path, name, state, timeout, max_bytes, max_retries)
+                results[name] = {"sent": sent, "offset": state["offset"]}
+            except Exception as e:
+                results[name] = {"error": str(e), "offset": state["offset"]}
+                print(f"[LOG] Failed to ship {name}: {e}")
+            finally:
+                offsets[name] = state
+                _write_json_atomic(self.log_offsets_path, offsets)
+
+        return results
+
+    def _ship_log_tail(self, url, log_path, name, state, timeout, max_bytes, max_retries=3):
+        """
+        POST the complete lines of `log_path` after state["offset"], advancing the offset
+        after each acknowledged request. More than `max_retries` offset conflicts in a row
+        (a server that keeps answering 409) raise instead of looping for the rest of the wake.
+
+        :return: Raw bytes acknowledged by the server.
+        """
+        sent = 0
+        conflicts = 0
+        with open(log_path, "rb") as f:
+            while True:
+                f.seek(state["offset"])
+                data = f.read(max_bytes)
+                data = data[:data.rfind(b"\n") + 1]   # Only whole lines
+                if not data:
+                    return sent
+
+                response = self.session.post(
+                    url, data=gzip.compress(data), timeout=(10, timeout),
+                    params={"node": 1, "location": f"{self.location}_GH_1", "file": name,
+                            "generation": state["generation"], "offset": state["offset"]},
+                    headers={"Content-Type": "application/gzip"},
+                )
+                if response.status_code == 409:
+                    # Server holds a different amount: continue from its offset
+                    server_offset = response.json().get("offset", 0)
+                    conflicts += 1
+                    if conflicts > max_retries:
+                        raise RuntimeError(f"Offset conflict at {state['offset']} (server: {server_offset})")
+                    state["offset"] = server_offset
+                    continue
+                if response.status_code != 200:
+                    raise RuntimeError(f"Status {response.status_code}")
+
+                conflicts = 0
+                state["offset"] += len(data)
+                sent += len(data)
+                print(f"[LOG] Shipped {len(data)} bytes of {name} (offset {state['offset']})")
+
+    def _read_json(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def upload_files_parallel(self, file_paths, timeout=300, upload_status=None, upload_names=None):
+        """
+        Upload several archives concurrently over the pooled session.
+
+        Files are submitted in the given order to a pool of `self.max_workers` threads.
+        Aggregate statistics are stored in `self.http_stats`.
+
+        :param file_paths: Archives to upload.
+        :param timeout: Per-file read timeout (seconds).
+        :param upload_status: Per-file upload function (defaults to single POST or chunked,
+                              depending on `self.chunk_size`).
+        :param upload_names: Optional dict of file path -> filename sent to the server.
+        :return: Dict of file path -> (status_code, text), as upload_file_status.
+        """
+        file_paths = list(file_paths)
+        upload_names = upload_names or {}
+        per_file = []
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {file_path: executor.submit(self.timed_upload, file_path, per_file, timeout, upload_status,
+                                                  upload_names.get(file_path))
+                       for file_path in file_paths}
+            results = {file_path: future.result() for file_path, future in futures.items()}
+        elapsed = time.monotonic() - start
+
+        self.http_stats = self.summarize_uploads(per_file, elapsed)
+        return results
+
+    def timed_upload(self, file_path, per_file, timeout=300, upload_status=None, upload_name=None):
+        """
+        Upload one archive and append its {"file", "status", "bytes", "seconds"} record
+        to `per_file`. `upload_name` is passed on to the upload function when given.
+
+        :return: (status_code, text), as upload_file_status.
+        """
+        if upload_status is None:
+            upload_status = self.upload_file_chunked if self.chunk_size > 0 else self.upload_file_status
+
+        start = time.monotonic()
+        if upload_name is None:
+            status_code, text = upload_status(file_path, timeout=timeout)
+        else:
+            status_code, text = upload_status(file_path, timeout=timeout, upload_name=upload_name)
+        elapsed = time.monotonic() - start
+        size = self.stream_bytes.pop(str(file_path), None)
+        if size is None:
+            size = os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+        size = size if status_code == 200 else 0
+        per_file.append({"file": Path(file_path).name, "status": status_code,
+                         "bytes": size, "seconds": round(elapsed, 3)})
+        return status_code, text
+
+    def summarize_uploads(self, per_file, elapsed):
+        """
+        :return: Aggregate statistics (the `self.http_stats` layout) for a batch of uploads.
+        """
+        total_bytes = sum(item["bytes"] for item in per_file)
+        stats = {
+            "files": len(per_file),
+            "succeeded": sum(1 for item in per_file if item["status"] == 200),
+            "bytes": total_bytes,
+            "seconds": round(elapsed, 3),
+            "throughput_kbps": round(total_bytes * 8 / 1000 / elapsed, 1) if elapsed > 0 else 0.0,
+            "per_file": per_file,
+        }
+        print(f"[HTTP] Uploaded {stats['succeeded']}/{stats['files']} files, "
+              f"{total_bytes} bytes in {elapsed:.2f} s ({stats['throughput_kbps']} kbit/s)")
+        return stats
+
+    def upload_item_streaming(self, item_path, timeout=300, block_size=64 * 1024):
+        """
+        Zip a file or folder on the fly straight into the multipart request body, without
+        writing a .zip to the SD card.
+
+        The archive is produced by zipfile writing into an unseekable _ZipStreamSink;
+        a generator drains the sink after every block read from the source, so memory
+        stays around one block plus deflate state. The request carries the same `file`
+        field and archive name as compress_each_file_in_directory + upload_zip_file.
+
+        When every entry is STORED (JPEGs and other precompressed files) the archive size
+        is known in advance and the request is sent with a Content-Length, like a normal
+        form upload. Otherwise it falls back to chunked transfer encoding, which the
+        server must accept (PHP under CGI may drop $_FILES for chunked requests).
+
+        :param item_path: File or folder inside the upload directory.
+        :param timeout: Read timeout for the HTTP request (seconds).
+        :param block_size: Bytes read from the source per step.
+        :return: (status_code, text) as upload_file_status.
+        """
+        url = f"{self.base_url}/ipm_web/PEST_IMAGES/RX_IMG.php?node=1&location={self.location}_GH_1"
+
+        if not os.path.exists(item_path):
+            print(f"File not found: {item_path}")
+            return None, "ERROR: File not found"
+
+        item_name = os.path.basename(os.path.normpath(item_path))
+        zip_name = f"{os.path.splitext(item_name)[0]}.zip"
+        boundary = uuid.uuid4().hex
+
+        head = (f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="{zip_name}"\r\n'
+                f"Content-Type: application/zip\r\n\r\n").encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        try:
+            archive_length = self._stored_zip_length(item_path)
+        except OSError as e:
+            return None, f"ERROR: {str(e)}"
+
+        def body():
+            sent = 0
+            yield head
+            for data in self._iter_zip_stream(item_path, block_size):
+                sent += len(data)
+                yield data
+            if archive_length is not None and sent != archive_length:
+                # A source changed size while streaming; abort rather than send a short body
+                raise IOError(f"Archive is {sent} bytes, announced {archive_length}")
+            yield tail
+            self.stream_bytes[str(item_path)] = sent
+
+        data = body()
+        if archive_length is not None:
+            data = _SizedBody(data, len(head) + archive_length + len(tail))
+
+        try:
+            response = self.session.post(
+                url, data=data, timeout=(10, timeout),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            )
+            if response.status_code == 200:
+                print(f"[HTTP] Streamed upload response: {response.text}")
+            return response.status_code, response.text
         except Exception as e:
-            return f"ERROR: {str(e)}"
+            return None, f"ERROR: {str(e)}"
+
+    def upload_directory_streaming(self, upload_dir, timeout=300):
+        """
+        Stream every file and folder in `upload_dir` as its own zip (see upload_item_streaming).
+        Items the ledger already knows as uploaded are reported as (200, "SKIPPED: uploaded")
+        without being sent again.
 
-    def clean_upload_files(self, upload_dir):
+        :return: Dict of item path -> (status_code, text).
+        """
+        results = {}
+        digests = {}
+        items = []
+        for item in sorted(os.listdir(upload_dir)):
+            item_path = os.path.join(upload_dir, item)
+            if self._skip_item(item):
+                continue
+            if self.ledger:
+                digests[item_path] = self.ledger.digest(item_path)
+                if self.ledger.skip_reason(digests[item_path][0]) == "uploaded":
+                    print(f"Skipping {item_path}: already uploaded")
+                    results[item_path] = (200, "SKIPPED: uploaded")
+                    continue
+            items.append(item_path)
+
+        sent = self.upload_files_parallel(items, timeout=timeout, upload_status=self.upload_item_streaming)
+        for item_path, (status_code, _) in sent.items():
+            if self.ledger and status_code == 200:
+                sha256, size = digests[item_path]
+                self.ledger.record(sha256, size, os.path.basename(item_path), "uploaded")
+        results.update(sent)
+        return results
+
+    def _stored_zip_length(self, item_path):
+        """
+        Size of the streamed archive of `item_path` if all of its entries will be STORED,
+        else None (deflated sizes are only known after compressing).
+
+        The framing (local headers, data descriptors, central directory) is measured by
+        writing the same entries without data into a sink; STORED data adds its file size.
+        """
+        entries = zip_entries(item_path)
+        if any(self.compression_policy.choose(src)[0] != zipfile.ZIP_STORED for src, _ in entries):
+            return None
+
+        sink = _ZipStreamSink()
+        data_size = 0
+        with zipfile.ZipFile(sink, "w") as zipf:
+            for src, arcname in entries:
+                zinfo = zipfile.ZipInfo.from_file(src, arcname)
+                zinfo.compress_type = zipfile.ZIP_STORED
+                with zipf.open(zinfo, "w"):
+                    pass
+                data_size += os.path.getsize(src)
+        length = sink.tell() + data_size
+        # ZIP64 records depend on the real offsets; leave those archives to chunked encoding
+        return length if length < zipfile.ZIP64_LIMIT else None
+
+    def _iter_zip_stream(self, item_path, block_size):
+        """
+        Yield the bytes of a zip archive of `item_path` as they are produced.
+        A folder is archived with paths relative to it, like shutil.make_archive.
+        """
+        sink = _ZipStreamSink()
+        with zipfile.ZipFile(sink, "w") as zipf:
+            for src, arcname in zip_entries(item_path):
+                entry = iter_zip_entry(zipf, src, arcname, self.compression_policy, block_size)
+                while True:
+                    try:
+                        next(entry)
+                    except StopIteration as done:
+                        self.compression_policy.record(done.value)
+                        break
+                    data = sink.pop()
+                    if data:
+                        yield data
+                data = sink.pop()
+                if data:
+                    yield data
+        yield sink.pop()
+
+    def clean_upload_files(self, upload_dir, items=None):
         """
         Deletes all files and directories in the upload directory except the "LOG" folder.
         
         :param upload_dir: The path to the upload directory (e.g., "upload_files").
+        :param items: Only delete these names (e.g. items confirmed by the server).
         """
-        for item in os.listdir(upload_dir):
+        for item in os.listdir(upload_dir) if items is None else items:
             item_path = os.path.join(upload_dir, item)
 
             # Skip the "LOG" directory (do not delete it)
@@ -157,7 +1413,78 @@ class DataUploader:
 
     def close(self):
         """
-        Close the UDP socket.
+        Close the UDP socket and the HTTP session.
         """
         self.sock.close()
         print("[UDP] Socket closed.")
+        self.session.close()
+        print("[HTTP] Session closed.")
+
+
+def _clamp(value, low, high):
+    """
+    Clamp a value into [low, high] so it fits its binary field.
+    """
+    return max(low, min(high, value))
+
+
+def _file_sha256(file_path, block_size=1024 * 1024):
+    """
+    SHA-256 hex digest of a file, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_kind(arcname):
+    """
+    Classify a bundle entry as "log", "image" or "data".
+    """
+    if arcname.startswith("LOG/") or arcname.endswith(".log"):
+        return "log"
+    if os.path.splitext(arcname)[1].lower() in (".jpg", ".jpeg", ".png"):
+        return "image"
+    return "data"
+
+
+def _capture_time(arcname):
+    """
+    Capture time encoded by CameraController.save_image ("NODE1_%Y_%m_%d %H_%M_%S.jpg").
+
+    :return: ISO timestamp, or None if the name does not carry one.
+    """
+    stem = os.path.splitext(os.path.basename(arcname))[0]
+    try:
+        return datetime.datetime.strptime(stem.split("_", 1)[1], "%Y_%m_%d %H_%M_%S").isoformat()
+    except (IndexError, ValueError):
+        return None
+
+
+def _read_json_list(path):
+    """
+    :return: JSON list stored at `path`, or [] if missing or unreadable.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def _write_json_atomic(path, data):
+    """
+    Write JSON to `path` via a temp file, fsync and rename, so a power cut never
+    leaves a truncated file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_UploadServer import DataUploader, CompressionPolicy
+from HP_Sensor import SensorReader
+
+NUM_IMAGES = 3
+IMAGE_SIZE = 6 * 1024 * 1024   # Typical 4608x2596 JPEG at quality 90
+
+
+def create_wake_content(upload_dir):
+    """
+    Representative content of one wake: JPEG images, a CSV export and the LOG folder.
+    Random bytes stand in for JPEG data (already entropy-coded).
+    """
+    os.makedirs(os.path.join(upload_dir, "LOG"), exist_ok=True)
+    with open(os.path.join(upload_dir, "LOG", "messages.log"), "w") as f:
+        for i in range(20000):
+            f.write(f"[M00] 2025-02-14 08:00:{i % 60:02d} Successfully recorded sensor data\n")
+    with open(os.path.join(upload_dir, "LOG", "errors.log"), "w") as f:
+        for i in range(2000):
+            f.write(f"[E00] 2025-02-14 08:00:{i % 60:02d} Unable to connect to the Internet\n")
+    with open(os.path.join(upload_dir, "sensor.csv"), "w") as f:
+        for i in range(50000):
+            f.write(f"2025-02-14 08:{i % 60:02d},{20 + i % 10 * 0.37:.2f},{55 + i % 13 * 0.21:.2f},{800 + i % 97}\n")
+    for i in range(NUM_IMAGES):
+        with open(os.path.join(upload_dir, f"NODE1_2025_02_14 08_00_{i:02d}.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff\xe0" + os.urandom(IMAGE_SIZE))
+
+
+def run(policy, workers=1):
+    upload_dir = tempfile.mkdtemp()
+    try:
+        create_wake_content(upload_dir)
+        uploader = DataUploader(location="PDS000000", SensorReader=SensorReader,
+                                compression_policy=policy, compress_workers=workers)
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        uploader.compress_each_file_in_directory(upload_dir)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        uploader.close()
+        return cpu, wall, policy.summary()
+    finally:
+        shutil.rmtree(upload_dir)
+
+
+if __name__ == "__main__":
+    results = {}
+    for name, policy in [
+        ("DEFLATE (old behaviour)", CompressionPolicy(mode="DEFLATE")),
+        ("AUTO", CompressionPolicy(mode="AUTO")),
+        ("AUTO + LZMA", CompressionPolicy(mode="AUTO", allow_lzma=True)),
+    ]:
+        results[name] = run(policy)
+
+    print("\n=== Compression per wake ===")
+    baseline_cpu = results["DEFLATE (old behaviour)"][0]
+    for name, (cpu, wall, summary) in results.items():
+        print(f"{name:24s} cpu={cpu:.2f} s wall={wall:.2f} s "
+              f"out={summary['bytes_out'] / 1e6:.2f} MB ratio={summary['ratio']} "
+              f"methods={summary['methods']} cpu_saved={baseline_cpu - cpu:.2f} s")
+
+    # Wall time versus process count (DEFLATE keeps every item CPU-bound)
+    print("\n=== Parallel compression (DEFLATE) ===")
+    single_wall = None
+    for workers in [1, 2, 4]:
+        _, wall, _ = run(CompressionPolicy(mode="DEFLATE"), workers=workers)
+        single_wall = single_wall or wall
+        print(f"workers={workers}: wall={wall:.2f} s speedup={single_wall / wall:.2f}x")
@@ -0,0 +1,142 @@
+import sys
+import time
+import shutil
+import random
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_IngestServer import TelemetryReceiver, ImageReceiver, _percentile
+from HP_UploadServer import DataUploader
+
+# Fleet and server model (scaled down: one wake slot window of SLOT_WINDOW seconds)
+NUM_NODES = 20
+IMAGE_SIZE = 1024 * 1024
+SERVER_BANDWIDTH = 4 * 1024 * 1024   # Server uplink shared by all nodes (bytes/s)
+SERVER_LATENCY = 0.1
+SLOT_WINDOW = 10
+SLOT_JITTER = 1
+
+
+class FakeSensorReader:
+    """Stand-in for SensorReader (no I2C bus needed)."""
+
+
+class FakeCamera:
+    """Stand-in for CameraController: writes an incompressible 'JPEG' and a log line."""
+
+    def __init__(self, upload_dir, seed):
+        self.upload_dir = upload_dir
+        self.random = random.Random(seed)
+
+    def save_image(self, node_id):
+        name = time.strftime(f"{node_id}_%Y_%m_%d %H_%M_%S.jpg")
+        (self.upload_dir / name).write_bytes(self.random.randbytes(IMAGE_SIZE))
+        log_dir = self.upload_dir / "LOG"
+        log_dir.mkdir(exist_ok=True)
+        with open(log_dir / "PDS.log", "a") as f:
+            f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} INFO M00 Image successfully saved\n")
+        return True
+
+
+def run_node(index, work_dir, telemetry, images, slot_window, slot_jitter, start_event):
+    """
+    One wake of a virtual node: capture, wait for the upload slot, send telemetry,
+    compress and upload with the real DataUploader.
+
+    :return: Dict with slot delay, wake duration and per-request upload times.
+    """
+    node_id = f"PDS{index:06d}"
+    upload_dir = work_dir / node_id / "upload_files"
+    upload_dir.mkdir(parents=True)
+    uploader = DataUploader(location=node_id, SensorReader=FakeSensorReader,
+                            state_dir=work_dir / node_id / "upload_state", compress_workers=1,
+                            server_ip="127.0.0.1", server_udp_port=telemetry.address[1],
+                            server_http_port=images.address[1],
+                            slot_window=slot_window, slot_jitter=slot_jitter)
+    camera = FakeCamera(upload_dir, seed=index)
+    sensor = random.Random(index)
+
+    start_event.wait()
+    wake_start = time.monotonic()
+    try:
+        camera.save_image(node_id)
+        slot_delay = uploader.wait_for_upload_slot()
+        upload_start = time.monotonic()
+        wifi_details = {"Interface": "wlan0", "Link Quality": sensor.randint(40, 90), "Signal Level": -60}
+        uploader.upload_sensor_data(sensor.uniform(20, 30), sensor.uniform(50, 80), sensor.uniform(100, 900),
+                                    wifi_details)
+        archives = [path for path in uploader.compress_each_file_in_directory(upload_dir).values()
+                    if not str(path).startswith(("ERROR:", "SKIPPED:"))]
+        uploader.upload_files_parallel(archives, timeout=120)
+        return {
+            "node": node_id,
+            "slot_delay": slot_delay,
+            "upload_seconds": time.monotonic() - upload_start,
+            "wake_seconds": time.monotonic() - wake_start,
+            "requests": [item["seconds"] for item in uploader.http_stats["per_file"]],
+            "succeeded": uploader.http_stats["succeeded"] == len(archives),
+        }
+    finally:
+        uploader.close()
+
+
+def run_fleet(slot_window, slot_jitter):
+    """
+    Run NUM_NODES nodes that all wake at the same moment against a fresh local server.
+    """
+    work_dir = Path(tempfile.mkdtemp())
+    telemetry = TelemetryReceiver(host="127.0.0.1", port=0)
+    images = ImageReceiver(host="127.0.0.1", port=0, latency=SERVER_LATENCY, bandwidth=SERVER_BANDWIDTH)
+    telemetry.start()
+    images.start()
+    start_event = threading.Event()
+    try:
+        with ThreadPoolExecutor(max_workers=NUM_NODES) as executor:
+            futures = [executor.submit(run_node, index, work_dir, telemetry, images,
+                                       slot_window, slot_jitter, start_event)
+                       for index in range(NUM_NODES)]
+            fleet_start = time.monotonic()
+            start_event.set()
+            nodes = [future.result() for future in futures]
+        fleet_seconds = time.monotonic() - fleet_start
+    finally:
+        telemetry.stop()
+        images.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    requests_seconds = sorted(seconds for node in nodes for seconds in node["requests"])
+    upload_seconds = sorted(node["upload_seconds"] for node in nodes)
+    wake_seconds = sorted(node["wake_seconds"] for node in nodes)
+    return {
+        "nodes": len(nodes),
+        "succeeded": sum(node["succeeded"] for node in nodes),
+        "telemetry_readings": len(telemetry.measurements),
+        "fleet_seconds": round(fleet_seconds, 2),
+        "server": images.stats(),
+        "request_p50": round(_percentile(requests_seconds, 50), 2),
+        "request_p95": round(_percentile(requests_seconds, 95), 2),
+        "request_p99": round(_percentile(requests_seconds, 99), 2),
+        "upload_p95": round(_percentile(upload_seconds, 95), 2),
+        "wake_p50": round(_percentile(wake_seconds, 50), 2),
+        "wake_p95": round(_percentile(wake_seconds, 95), 2),
+    }
+
+
+if __name__ == "__main__":
+    # Compare the thundering herd (everyone uploads at the wake hour) with upload slots
+    results = {
+        "synchronized": run_fleet(slot_window=0, slot_jitter=0),
+        "slotted": run_fleet(slot_window=SLOT_WINDOW, slot_jitter=SLOT_JITTER),
+    }
+
+    print(f"\n{NUM_NODES} nodes, {IMAGE_SIZE // 1024} KiB image each, "
+          f"server {SERVER_BANDWIDTH * 8 // 1000 // 1000} Mbit/s, slot window {SLOT_WINDOW} s")
+    for name, result in results.items():
+        server = result["server"]
+        print(f"{name:>12}: {result['succeeded']}/{result['nodes']} ok, fleet {result['fleet_seconds']} s, "
+              f"server {server['throughput_kbps']} kbit/s, "
+              f"request p50/p95/p99 {result['request_p50']}/{result['request_p95']}/{result['request_p99']} s, "
+              f"upload p95 {result['upload_p95']} s, wake p50/p95 {result['wake_p50']}/{result['wake_p95']} s")
@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_IngestServer import TelemetryReceiver, ImageReceiver
+from HP_UploadServer import DataUploader
+from HP_Sensor import SensorReader
+
+# Local receiver on a free port (30% loss and 50 ms ACK latency for the reliable run)
+Receiver = TelemetryReceiver(host="127.0.0.1", port=0)
+Lossy_Receiver = TelemetryReceiver(host="127.0.0.1", port=0, loss_rate=0.3, latency=0.05, seed=1)
+
+# Local RX_IMG.php / RX_CHUNK.php receiver
+Work_Dir = Path(tempfile.mkdtemp())
+Http_Receiver = ImageReceiver(host="127.0.0.1", port=0, save_dir=Work_Dir / "received")
+
+# Point the uploader at the local receivers instead of the production server
+Data_Uploader = DataUploader(location="PDS000000", SensorReader=SensorReader,
+                             server_ip="127.0.0.1", server_udp_port=Receiver.address[1],
+                             server_http_port=Http_Receiver.address[1])
+
+if __name__ == "__main__":
+    Receiver.start()
+    Lossy_Receiver.start()
+    Http_Receiver.start()
+    try:
+        wifi_details = {"Interface": "wlan0", "Link Quality": 70, "Signal Level": -55}
+        for packet_format in ["LEGACY", "BATCH", "BINARY"]:
+            Data_Uploader.packet_format = packet_format
+            Data_Uploader.upload_sensor_data(25.31, 61.2, 830.5, wifi_details)
+
+        # Reliable mode against the lossy receiver
+        Data_Uploader.server_ip, Data_Uploader.server_udp_port = Lossy_Receiver.address
+        Data_Uploader.reliable = True
+        delivered = Data_Uploader.upload_sensor_data(25.31, 61.2, 830.5, wifi_details)
+        print(f"Reliable delivery: {delivered}, stats: {Data_Uploader.udp_stats}")
+
+        # Single-POST and chunked archive uploads
+        archive = Work_Dir / "NODE1_test.zip"
+        archive.write_bytes(os.urandom(1024 * 1024))
+        print("Single POST:", Data_Uploader.upload_file_status(archive))
+        Data_Uploader.chunk_size = 256 * 1024
+        Data_Uploader.resume_state_path = Work_Dir / "resume.json"
+        print("Chunked:", Data_Uploader.upload_file_chunked(archive))
+    finally:
+        Data_Uploader.close()
+        Receiver.stop()
+        Lossy_Receiver.stop()
+        Http_Receiver.stop()
+
+    print(f"Datagrams received: {Receiver.datagrams}")
+    print(f"Measurements decoded: {len(Receiver.measurements)}")
+    print(f"Decode errors: {Receiver.errors}")
+    print(f"Lossy receiver: dropped={Lossy_Receiver.dropped}, duplicates={Lossy_Receiver.duplicates}")
+    print(f"HTTP requests: {len(Http_Receiver.uploads)}")
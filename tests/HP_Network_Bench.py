@@ -0,0 +1,58 @@
+import sys
+import time
+import requests
+import subprocess
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_Network import RaspController, NetworkManagerDBus, ConnectivityProber
+
+REPEAT = 50
+
+
+def per_call(function, *args, repeat=REPEAT):
+    """
+    :return: (mean seconds per call, last result)
+    """
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    return (time.perf_counter() - start) / repeat, result
+
+
+if __name__ == "__main__":
+    native = RaspController(backend="AUTO")
+    forked = RaspController(backend="SUBPROCESS")
+
+    # Link details: /proc/net/wireless and /sys/class/net vs iwconfig / ethtool
+    for interface in ["wlan0", "eth0"]:
+        native_seconds, native_result = per_call(native.sysfs.get_network_details, interface)
+        forked_seconds, forked_result = per_call(forked.get_network_details, interface)
+        print(f"{interface}: sysfs {native_seconds * 1e6:.1f} us -> {native_result}")
+        print(f"{interface}: subprocess {forked_seconds * 1e6:.1f} us -> {forked_result}")
+
+    # Saved profiles: NetworkManager D-Bus vs nmcli
+    nm_dbus = NetworkManagerDBus()
+    if nm_dbus.available:
+        dbus_seconds, profiles = per_call(nm_dbus.connections, repeat=10)
+        print(f"D-Bus ListConnections: {dbus_seconds * 1e3:.2f} ms ({len(profiles)} profiles)")
+    else:
+        print("NetworkManager D-Bus not available")
+    try:
+        nmcli_seconds, _ = per_call(subprocess.run, ["nmcli", "-t", "-f", "NAME,TYPE", "connection", "show"], repeat=10)
+        print(f"nmcli connection show: {nmcli_seconds * 1e3:.2f} ms")
+    except FileNotFoundError:
+        print("nmcli not installed")
+
+    # Connectivity: probe race vs the former full HTTP GET
+    prober = ConnectivityProber()
+    result = prober.probe(force=True)
+    print(f"Probe race: {result['latency_ms']} ms, reachable={result['reachable']}, online={result['online']}")
+    print(f"Probe (cached): {per_call(prober.probe)[0] * 1e6:.1f} us")
+    start = time.perf_counter()
+    try:
+        requests.get("http://google.com", timeout=5)
+    except requests.RequestException as e:
+        print(f"HTTP GET failed: {e}")
+    print(f"HTTP GET google.com: {(time.perf_counter() - start) * 1e3:.1f} ms")
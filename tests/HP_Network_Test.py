@@ -1,5 +1,5 @@
 import sys
-import time
+import tempfile
 from pathlib import Path
 from ruamel.yaml import YAML
 
@@ -12,7 +12,7 @@ from HP_LogManager import LogManager
 # Initialize controllers
 Rasp_Controller = RaspController()
 Wifi_Gui = WifiConfigGui()
-Log_Manager = LogManager()
+Log_Manager = LogManager(log_dir=tempfile.mkdtemp())  # Keep test logs out of upload_files
 Yaml = YAML()
 
 # Load configuration file
@@ -21,6 +21,7 @@ PDS_ID = CONFIG_DATA["CONFIG"].get("PDS_ID")
 PDS_MODE = CONFIG_DATA["CONFIG"].get("PDS_MODE")
 EXECUTION_HOURS = CONFIG_DATA["RPI"].get("EXECUTION_HOURS")
 NETWORK_THRES = CONFIG_DATA["NETWORK"].get("NETWORK_THRES")
+NETWORK_READY_TIMEOUT = CONFIG_DATA["NETWORK"].get("READY_TIMEOUT", 20)
 
 # =================================
 
@@ -44,6 +45,7 @@ if __name__ == "__main__":
 
         # Check if Wi-Fi credentials not exist
         if not wifi_ssid or not wifi_password:
+            Wifi_Gui.scan_networks()  # Scan before hostapd takes over wlan0
             Rasp_Controller.start_ap_mode()
             Wifi_Gui.run_server()
             Rasp_Controller.stop_ap_mode()
@@ -55,13 +57,14 @@ if __name__ == "__main__":
         else:
             Rasp_Controller.restart_networkmanager()
 
-        # Wait for 20 seconds to ensure network stability
-        time.sleep(20)
+        # Wait until wlan0 has an address, a default route and upstream reachability
+        Rasp_Controller.wait_until_ready(interface="wlan0", deadline=NETWORK_READY_TIMEOUT)
 
         # Check if the system is successfully connected to Wi-Fi
         if Rasp_Controller.is_wifi_connected():
             break  # Exit loop when successfully connected
         else:
+            Wifi_Gui.scan_networks()  # Scan before hostapd takes over wlan0
             Rasp_Controller.start_ap_mode()
             Wifi_Gui.run_server()
             Rasp_Controller.stop_ap_mode()
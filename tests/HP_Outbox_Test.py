@@ -0,0 +1,111 @@
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_Outbox import UploadOutbox, UploadLedger
+from HP_UploadServer import UploadScheduler
+
+
+class FlakyUploader:
+    """Stand-in uploader: rejects the first attempt of every archive."""
+
+    def __init__(self):
+        self.attempts = {}
+        self.http_stats = {}
+        self.received = []
+
+    def upload_file_status(self, file_path, timeout=300, upload_name=None):
+        name = Path(file_path).name
+        self.attempts[name] = self.attempts.get(name, 0) + 1
+        if self.attempts[name] == 1:
+            return 503, "Service Unavailable"
+        self.received.append(upload_name or name)
+        return 200, "OK"
+
+    def upload_files_parallel(self, file_paths, timeout=300, upload_names=None):
+        self.http_stats = {"per_file": []}
+        upload_names = upload_names or {}
+        return {path: self.upload_file_status(path, timeout, upload_names.get(path)) for path in file_paths}
+
+
+if __name__ == "__main__":
+    work_dir = Path(tempfile.mkdtemp())
+    upload_dir = work_dir / "upload_files"
+    upload_dir.mkdir()
+
+    for name in ["NODE1_2025_02_14 08_00_00.zip", "NODE1_thumb.zip", "LOG.zip"]:
+        with zipfile.ZipFile(upload_dir / name, "w") as zipf:
+            zipf.writestr("data.txt", name)
+
+    outbox = UploadOutbox(outbox_dir=work_dir / "outbox", retry_base=0)
+    for zip_file in upload_dir.glob("*.zip"):
+        outbox.enqueue(zip_file)
+    print("Upload order:", [entry["name"] for entry in outbox.pending()])
+
+    uploader = FlakyUploader()
+    print("Wake 1:", outbox.process(uploader))
+
+    # Reload from disk, as the next wake would
+    outbox = UploadOutbox(outbox_dir=work_dir / "outbox", retry_base=0)
+    print("Pending after reload:", [entry["name"] for entry in outbox.pending()])
+    print("Wake 2:", outbox.process(uploader))
+    print("Remaining:", list(outbox.items))
+
+    # Ledger: an archive confirmed by the server marks its source content as uploaded
+    ledger = UploadLedger(ledger_path=work_dir / "ledger.json")
+    image = upload_dir / "NODE1_2025_02_14 12_00_00.jpg"
+    image.write_bytes(b"\xff\xd8" + b"\0" * 1024)
+    archive = upload_dir / "NODE1_2025_02_14 12_00_00.zip"
+    with zipfile.ZipFile(archive, "w") as zipf:
+        zipf.write(image, arcname=image.name)
+    sha256, size = ledger.digest(image)
+    ledger.record(sha256, size, image.name, "compressed", archive=archive)
+    print("Before enqueue:", ledger.skip_reason(sha256))
+
+    outbox = UploadOutbox(outbox_dir=work_dir / "outbox", retry_base=0, ledger=ledger)
+    outbox.enqueue(archive)
+    print("After enqueue:", ledger.skip_reason(sha256))
+    outbox.process(uploader)
+    outbox.process(uploader)
+    print("After upload:", UploadLedger(ledger_path=work_dir / "ledger.json").skip_reason(sha256))
+
+    # Scheduler: on a weak link only the small archives fit into a short wake
+    for index in range(2):
+        image = upload_dir / f"NODE1_2025_02_14 1{index}_30_00.zip"
+        image.write_bytes(b"\0" * 4 * 1024 * 1024)
+        outbox.enqueue(image)
+    (upload_dir / "LOG.zip").write_bytes(b"\0" * 16 * 1024)
+    outbox.enqueue(upload_dir / "LOG.zip")
+    scheduler = UploadScheduler(history_path=work_dir / "throughput.json")
+    print("Weak link:", outbox.process(uploader, scheduler=scheduler, remaining_seconds=60,
+                                      wifi_details={"Link Quality": 30}))
+
+    # Later wakes on the same link: each image is forced out after max_deferrals wakes
+    for wake in range(1, 6):
+        print(f"Weak link, wake {wake + 1}:", outbox.process(uploader, scheduler=scheduler, remaining_seconds=60,
+                                                           wifi_details={"Link Quality": 30}))
+
+    # Name clash: the second archive is stored under a suffixed name but uploaded under its own
+    outbox = UploadOutbox(outbox_dir=work_dir / "clash_outbox", retry_base=0)
+    for index in range(2):
+        with zipfile.ZipFile(upload_dir / "NODE1_2025_02_15 08_00_00.zip", "w") as zipf:
+            zipf.writestr("data.txt", str(index))
+        outbox.enqueue(upload_dir / "NODE1_2025_02_15 08_00_00.zip")
+    print("Clash on disk:", sorted(outbox.items))
+    uploader = FlakyUploader()
+    outbox.process(uploader)
+    outbox.process(uploader)
+    print("Clash received by the server:", uploader.received)
+
+    # A superseding LOG archive keeps the backoff of the one it replaces
+    outbox = UploadOutbox(outbox_dir=work_dir / "log_outbox", retry_base=1800)
+    (upload_dir / "LOG.zip").write_bytes(b"\0" * 1024)
+    outbox.enqueue(upload_dir / "LOG.zip")
+    outbox.process(FlakyUploader())
+    (upload_dir / "LOG.zip").write_bytes(b"\0" * 2048)
+    outbox.enqueue(upload_dir / "LOG.zip")
+    entry = outbox.items["LOG.zip"]
+    print("Superseded LOG:", {key: entry[key] for key in ("attempts", "last_error")},
+          "due now:", bool(outbox.due_items()))
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_IngestServer import ImageReceiver
+from HP_UploadServer import DataUploader, UploadScheduler
+from HP_UploadPipeline import UploadPipeline
+from HP_Outbox import UploadOutbox
+
+NUM_FILES = 8
+FILE_SIZE = 2 * 1024 * 1024
+SERVER_LATENCY = 0.3
+
+
+class FakeSensorReader:
+    """Stand-in for SensorReader (no I2C bus needed)."""
+
+
+def make_upload_dir(work_dir):
+    upload_dir = work_dir / "upload_files"
+    upload_dir.mkdir()
+    for i in range(NUM_FILES):
+        # Half random (incompressible), half text-like
+        data = os.urandom(FILE_SIZE // 2) + b"PDS,25.0,60.0,1000\n" * (FILE_SIZE // 40)
+        (upload_dir / f"NODE1_{i}.csv").write_bytes(data)
+    return upload_dir
+
+
+if __name__ == "__main__":
+    receiver = ImageReceiver(host="127.0.0.1", port=0, latency=SERVER_LATENCY)
+    receiver.start()
+
+    try:
+        # Sequential: compress everything, then upload everything
+        work_dir = Path(tempfile.mkdtemp())
+        upload_dir = make_upload_dir(work_dir)
+        uploader = DataUploader(location="PDS000000", SensorReader=FakeSensorReader, max_workers=2)
+        uploader.base_url = receiver.base_url
+        outbox = UploadOutbox(outbox_dir=work_dir / "outbox")
+        start = time.monotonic()
+        uploader.compress_each_file_in_directory(upload_dir)
+        for zip_file in upload_dir.glob("*.zip"):
+            outbox.enqueue(zip_file)
+        outbox.process(uploader)
+        sequential = time.monotonic() - start
+        uploader.close()
+        shutil.rmtree(work_dir)
+
+        # Pipeline: uploads start as soon as the first archive is ready
+        work_dir = Path(tempfile.mkdtemp())
+        upload_dir = make_upload_dir(work_dir)
+        uploader = DataUploader(location="PDS000000", SensorReader=FakeSensorReader, max_workers=2)
+        uploader.base_url = receiver.base_url
+        pipeline = UploadPipeline(uploader, UploadOutbox(outbox_dir=work_dir / "outbox"))
+        start = time.monotonic()
+        result = pipeline.run(upload_dir)
+        overlapped = time.monotonic() - start
+        uploader.close()
+
+        print(f"Sequential: {sequential:.2f} s, pipeline: {overlapped:.2f} s, "
+              f"uploaded {len(result['uploaded'])}/{NUM_FILES}")
+        print(f"Stage timings: {result['timings']}")
+
+        # Deadline: the rest stays in the outbox
+        shutil.rmtree(work_dir)
+        work_dir = Path(tempfile.mkdtemp())
+        upload_dir = make_upload_dir(work_dir)
+        uploader = DataUploader(location="PDS000000", SensorReader=FakeSensorReader, max_workers=2)
+        uploader.base_url = receiver.base_url
+        result = UploadPipeline(uploader, UploadOutbox(outbox_dir=work_dir / "outbox")).run(upload_dir, deadline=1.0)
+        print(f"Deadline 1 s: timed_out={result['timed_out']}, uploaded={len(result['uploaded'])}, "
+              f"failed={len(result['failed'])}, deferred={len(result['deferred'])}, "
+              f"pending={len(result['pending'])}")
+        uploader.close()
+        shutil.rmtree(work_dir)
+
+        # Scheduler: only what fits into the wake budget is sent, the rest is deferred
+        work_dir = Path(tempfile.mkdtemp())
+        upload_dir = make_upload_dir(work_dir)
+        uploader = DataUploader(location="PDS000000", SensorReader=FakeSensorReader, max_workers=2)
+        uploader.base_url = receiver.base_url
+        scheduler = UploadScheduler(history_path=work_dir / "throughput.json", request_overhead=1.0)
+        outbox = UploadOutbox(outbox_dir=work_dir / "outbox")
+        result = UploadPipeline(uploader, outbox, scheduler=scheduler).run(
+            upload_dir, deadline=5.0, wifi_details={"Speed": 100})
+        print(f"Scheduled 5 s: uploaded={len(result['uploaded'])}, failed={len(result['failed'])}, "
+              f"deferred={len(result['deferred'])}, deferrals="
+              f"{sorted(entry['deferrals'] for entry in outbox.pending())}")
+        uploader.close()
+        shutil.rmtree(work_dir)
+    finally:
+        receiver.stop()
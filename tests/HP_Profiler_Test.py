@@ -0,0 +1,50 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_Profiler import StartupProfile, WakeCycle
+
+profile = StartupProfile()
+
+
+class FakeCamera:
+    """Stand-in for CameraController with a slow constructor."""
+
+    def __init__(self):
+        time.sleep(0.2)
+        self.picam2 = None
+
+
+def make_camera():
+    with profile.measure("init", "FakeCamera"):
+        return FakeCamera()
+
+
+if __name__ == "__main__":
+    # Imports main.py does at start-up
+    with profile.measure("import", "HP_Network"):
+        from HP_Network import RaspController
+    with profile.measure("import", "HP_SystemMetrics"):
+        from HP_SystemMetrics import SystemMetrics
+
+    # Lazy subsystem: nothing is built until an attribute is used
+    camera = profile.lazy("FakeCamera", make_camera)
+    print(f"Before use: {camera}")
+    profile.mark("first action")
+    print(f"picam2: {camera.picam2}, after use: {camera}")
+
+    print(profile.report())
+    print(f"Totals: {profile.totals()}")
+
+    # Wake phases with readiness conditions instead of fixed sleeps
+    wake = WakeCycle(power_w=3.0)
+    wake.enter("boot")
+    ready_at = time.monotonic() + 0.3
+    wake.wait_until("interfaces ready", lambda: time.monotonic() >= ready_at, deadline=10)
+    wake.enter("upload")
+    time.sleep(0.2)
+    wake.enter("shutdown")
+    wake.wait_until("never ready", lambda: False, deadline=0.2)
+    print(wake.report())
+    print(f"Summary: {wake.summary()}")
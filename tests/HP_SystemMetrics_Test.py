@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_SystemMetrics import SystemMetrics, format_df_size
+
+REPEAT = 200
+
+if __name__ == "__main__":
+    metrics = SystemMetrics(ttl=0)
+    print("Snapshot:", metrics.snapshot())
+    print(f"Free disk: {format_df_size(metrics.disk()['disk_free_bytes'])} (df -h: "
+          f"{os.popen('df -h /').readlines()[1].split()[3]})")
+
+    # Per-call cost: uncached read vs cached read vs forking df
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        metrics.snapshot()
+    uncached = (time.perf_counter() - start) / REPEAT
+
+    cached_metrics = SystemMetrics(ttl=60)
+    cached_metrics.snapshot()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        cached_metrics.snapshot()
+    cached = (time.perf_counter() - start) / REPEAT
+
+    start = time.perf_counter()
+    for _ in range(20):
+        os.popen("df -h /").readlines()
+    forked = (time.perf_counter() - start) / 20
+
+    print(f"snapshot uncached: {uncached * 1e6:.1f} us, cached: {cached * 1e6:.1f} us, df -h fork: {forked * 1e6:.1f} us")
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "modules"))
+from HP_IngestServer import ImageReceiver
+from HP_UploadServer import DataUploader
+from HP_Sensor import SensorReader
+
+NUM_FILES = 8
+FILE_SIZE = 512 * 1024
+SERVER_LATENCY = 0.2
+LINK_BANDWIDTH = 512 * 1024
+
+if __name__ == "__main__":
+    # Local RX_IMG.php stand-in with a fixed per-request delay
+    receiver = ImageReceiver(host="127.0.0.1", port=0, latency=SERVER_LATENCY)
+    receiver.start()
+
+    work_dir = Path(tempfile.mkdtemp())
+    zip_files = []
+    for i in range(NUM_FILES):
+        zip_file = work_dir / f"NODE1_{i}.zip"
+        zip_file.write_bytes(os.urandom(FILE_SIZE))
+        zip_files.append(zip_file)
+
+    try:
+        for workers in [1, 2, 4]:
+            uploader = DataUploader(location="PDS000000", SensorReader=SensorReader, max_workers=workers,
+                                    server_ip=receiver.address[0], server_http_port=receiver.address[1])
+            uploader.upload_files_parallel(zip_files)
+            stats = uploader.http_stats
+            print(f"workers={workers}: {stats['succeeded']}/{stats['files']} files, "
+                  f"{stats['seconds']} s, {stats['throughput_kbps']} kbit/s")
+            uploader.close()
+    finally:
+        receiver.stop()
+
+    print(f"Requests served: {len(receiver.uploads)}, client connections: {len(receiver.connections)}")
+    print(f"Receiver stats: {receiver.stats()}")
+
+    # Weak link: 4 Mbit/s shared cap and 10% dropped requests
+    receiver = ImageReceiver(host="127.0.0.1", port=0, latency=SERVER_LATENCY,
+                             loss_rate=0.1, bandwidth=LINK_BANDWIDTH, seed=1)
+    receiver.start()
+    try:
+        uploader = DataUploader(location="PDS000000", SensorReader=SensorReader, max_workers=2,
+                                server_ip=receiver.address[0], server_http_port=receiver.address[1])
+        uploader.upload_files_parallel(zip_files, timeout=60)
+        print(f"Capped link: client={uploader.http_stats['throughput_kbps']} kbit/s, receiver={receiver.stats()}")
+        uploader.close()
+    finally:
+        receiver.stop()